@@ -0,0 +1,170 @@
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+# Replica the reads of the current request go to, None for the primary
+current_replica = ContextVar("current_replica", default=None)
+
+
+class ReplicaPool:
+    """
+    Picks the replica of settings.DATABASE_REPLICAS with the fewest requests in flight in this process.
+    A replica failing its health check is skipped for settings.REPLICA_RETRY_SECONDS, one passing it
+    is not checked again for settings.REPLICA_HEALTH_CHECK_SECONDS (by any thread, though connections are per thread)
+    """
+
+    def __init__(self):
+        self._in_flight = Counter()
+        self._down_until = {}
+        self._up_until = {}
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Returns a healthy replica alias, or None if there is none. Every acquired alias must be released
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = sorted(
+                (alias for alias in settings.DATABASE_REPLICAS if self._down_until.get(alias, 0) <= now), key=lambda alias: self._in_flight[alias]
+            )
+            checked = {alias for alias in candidates if self._up_until.get(alias, 0) > now}
+
+        for alias in candidates:
+            if alias in checked or self.is_healthy(alias):
+                with self._lock:
+                    if alias not in checked:
+                        self._up_until[alias] = now + settings.REPLICA_HEALTH_CHECK_SECONDS
+                    self._in_flight[alias] += 1
+                return alias
+            with self._lock:
+                self._down_until[alias] = now + settings.REPLICA_RETRY_SECONDS
+        return None
+
+    def release(self, alias: str):
+        with self._lock:
+            self._in_flight[alias] -= 1
+
+    @staticmethod
+    def is_healthy(alias: str) -> bool:
+        """
+        Reconnects a persistent connection (CONN_MAX_AGE) that is no longer usable, the way CONN_HEALTH_CHECKS of Django 4.1 does
+        """
+        connection = connections[alias]
+        try:
+            if connection.connection is not None and not connection.is_usable():
+                connection.close()
+            connection.ensure_connection()
+        except DatabaseError:
+            connection.close()
+            return False
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._in_flight.clear()
+            self._down_until.clear()
+            self._up_until.clear()
+
+
+pool = ReplicaPool()
+
+
+def pins():
+    """
+    Cache of the pins, settings.REPLICA_PIN_CACHE_ALIAS. A pin is seen by every process only if the cache is shared,
+    with LocMem the other processes keep sending the writer's reads to replicas
+    """
+    return caches[settings.REPLICA_PIN_CACHE_ALIAS]
+
+
+def pin_key(request, user) -> str:
+    # Per user, per address for anonymous clients. Never the raw credentials, made-up ones would each get a pin of their own
+    if user is not None and user.is_authenticated:
+        return f"replica-pin:user:{user.pk}"
+    return f"replica-pin:address:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def authenticate(request):
+    """
+    User of the request by the authenticators of the API, which run later in the view. None for invalid credentials
+    """
+    try:
+        return Request(request, authenticators=[authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES]).user
+    except APIException:
+        return None
+
+
+class ReplicaMiddleware:
+    """
+    Sends the reads of safe-method requests to views with `replica_reads = True` to a replica of the pool.
+    A client whose write succeeded (2xx) is pinned to the primary for settings.REPLICA_PIN_SECONDS, so it reads its own writes
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if 200 <= response.status_code < 300:
+                # Set by the view (DRF passes its user on to the request) or by AuthenticationMiddleware
+                pins().set(pin_key(request, getattr(request, "user", None)), True, settings.REPLICA_PIN_SECONDS)
+            return response
+
+        alias = self.reads_from_replica(request) and pool.acquire()
+        if not alias:
+            return self.get_response(request)
+
+        token = current_replica.set(alias)
+        try:
+            return self.get_response(request)
+        finally:
+            current_replica.reset(token)
+            pool.release(alias)
+
+    @staticmethod
+    def reads_from_replica(request) -> bool:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        view = getattr(match.func, "cls", match.func)
+        if not getattr(view, "replica_reads", False):
+            return False
+        # The view rejects invalid credentials anyway, from the primary
+        user = authenticate(request)
+        return user is not None and not pins().get(pin_key(request, user))
+
+
+class ReplicaRouter:
+    """
+    Reads go to the replica chosen by ReplicaMiddleware for the request, everything else to the primary.
+    Replicas hold the same data, so objects read from one can be related to and saved on the primary
+    """
+
+    def db_for_read(self, model, **hints):
+        return current_replica.get()
+
+    def db_for_write(self, model, **hints):
+        # Otherwise Django writes an instance back to the database it was read from
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -45,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'book_review_app.middleware.TimingMiddleware',
+    'book_review_api.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,11 +58,71 @@ MIDDLEWARE = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": 
-        ["rest_framework.authentication.TokenAuthentication"],
+        ["book_review_app.authentication.CachedTokenAuthentication"],
     'DEFAULT_PERMISSION_CLASSES': 
-        ['rest_framework.permissions.IsAuthenticated']
+        ['rest_framework.permissions.IsAuthenticated'],
+    'DEFAULT_PAGINATION_CLASS':
+        'book_review_app.pagination.CursorPagination',
+    'PAGE_SIZE': 50,
+    # orjson based when it's installed, stdlib json otherwise
+    'DEFAULT_RENDERER_CLASSES':
+        ['book_review_app.renderers.FastJSONRenderer', 'rest_framework.renderers.BrowsableAPIRenderer'],
+    'DEFAULT_PARSER_CLASSES':
+        ['book_review_app.renderers.FastJSONParser', 'rest_framework.parsers.FormParser', 'rest_framework.parsers.MultiPartParser'],
+    # Token buckets per user or IP, see book_review_app.throttling
+    'DEFAULT_THROTTLE_CLASSES':
+        ['book_review_app.throttling.ReadThrottle', 'book_review_app.throttling.WriteThrottle'],
+    'DEFAULT_THROTTLE_RATES': {
+        'read': '1000/min',
+        'write': '120/min',
+        # Both hash a password with PBKDF2
+        'register': '10/hour',
+        'token_auth': '20/min',
+    },
+    # Reverse proxies in front of the app. Anonymous requests are throttled per the address the last of them saw
+    # in X-Forwarded-For, per REMOTE_ADDR with 0. Never trust X-Forwarded-For deeper than the proxies really are
+    'NUM_PROXIES': 0,
+}
+
+# Hard cap for ?page_size= on every paginated list
+PAGINATION_MAX_PAGE_SIZE = 500
+
+# token -> user resolution cache of CachedTokenAuthentication.
+# LocMemLRUCache is per process, use book_review_app.cache.DjangoCache with a shared
+# backend (OPTIONS: alias, timeout, key_prefix) to invalidate logouts across processes immediately
+TOKEN_AUTH_CACHE = {
+    'BACKEND': 'book_review_app.cache.LocMemLRUCache',
+    'OPTIONS': {'max_entries': 10000, 'timeout': 60},
+}
+
+# Send the phases measured by book_review_app.middleware.TimingMiddleware back as a Server-Timing header
+SERVER_TIMING_HEADER = True
+
+# Store of the throttling token buckets. LocMemBucketStore is per process,
+# book_review_app.throttling.CacheBucketStore (OPTIONS: alias, key_prefix) shares buckets through one of CACHES
+THROTTLE_STORE = {
+    'BACKEND': 'book_review_app.throttling.LocMemBucketStore',
+    'OPTIONS': {'max_entries': 100000},
 }
 
+# Cache (one of CACHES) used by GenreViewSet responses and their generation counters. Generations are bumped after
+# the write commits, in the cache of the writing process only with the default LocMem backend: use a shared backend
+# with several processes, the others serve stale responses for up to RESPONSE_CACHE_TIMEOUT otherwise
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Max number of items accepted by /api/books/bulk/ and /api/books/<pk>/comments/bulk/
+BULK_CREATE_MAX_BATCH_SIZE = 500
+
+# Full-text search index: 'fts5' (SQLite FTS5), 'python' (own tables, any database) or 'auto'
+SEARCH_BACKEND = 'auto'
+
+# Number of books read from the DB at once by /api/books/export/
+EXPORT_CHUNK_SIZE = 500
+
+# Lists and export are represented from .values() rows by compiled serializers (book_review_app.compiled) instead of DRF serializers
+COMPILED_SERIALIZERS = False
+
 ROOT_URLCONF = 'book_review_api.urls'
 
 TEMPLATES = [
@@ -89,9 +151,57 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'CONN_MAX_AGE': 60,
+    },
+    # SQLite stand-ins for read replicas (copies of db.sqlite3), mirrors of default in tests
+    'replica1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica1.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    },
+    'replica2': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica2.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+DATABASE_ROUTERS = ['book_review_api.replicas.ReplicaRouter']
+
+# Aliases of DATABASES that safe-method reads of views with `replica_reads = True` go to, see book_review_api.replicas
+DATABASE_REPLICAS = []
+
+# Seconds a client reads from the primary after its own successful write
+REPLICA_PIN_SECONDS = 5
+
+# Cache (one of CACHES) holding those pins. With the default LocMem backend a pin exists in the writing process only,
+# the others send the client's reads to replicas: use a shared backend with several processes
+REPLICA_PIN_CACHE_ALIAS = 'default'
+
+# Seconds a replica that failed its health check is left out
+REPLICA_RETRY_SECONDS = 30
+
+# Seconds a replica that passed its health check is used without checking it again
+REPLICA_HEALTH_CHECK_SECONDS = 1
+
+# PRAGMAs run on every new SQLite connection (book_review_app.signals). WAL lets readers work alongside the writer,
+# busy_timeout (ms) makes a writer wait for the lock instead of failing with "database is locked" at once
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 268435456,
+    'cache_size': -65536,
+    'temp_store': 'memory',
+}
+
+# Attempts of a write (book_review_app.mixins.WriteRetryMixin) while SQLite answers "database is locked",
+# waiting WRITE_RETRY_BACKOFF seconds before the second one and twice as long before every next one
+WRITE_RETRY_ATTEMPTS = 5
+WRITE_RETRY_BACKOFF = 0.05
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
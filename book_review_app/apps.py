@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BookReviewAppConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "book_review_app"
+
+    def ready(self):
+        from book_review_app import signals  # noqa: F401
@@ -0,0 +1,23 @@
+from rest_framework.authentication import TokenAuthentication
+
+from book_review_app.cache import get_cache
+
+
+def token_cache():
+    return get_cache("TOKEN_AUTH_CACHE")
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that keeps resolved tokens in TOKEN_AUTH_CACHE.
+    Entries are dropped by book_review_app.signals when a token is deleted or its user is changed
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache().get(key)
+        if token is not None:
+            return (token.user, token)
+
+        user, token = super().authenticate_credentials(key)
+        token_cache().set(key, token)
+        return (user, token)
@@ -0,0 +1,237 @@
+import hashlib
+import math
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.cache import get_conditional_response, parse_etags
+from django.utils.http import http_date
+from django.utils.module_loading import import_string
+from rest_framework import status
+from rest_framework.response import Response
+
+from book_review_app import models
+
+
+class LocMemLRUCache:
+    """
+    Process-local LRU cache with TTL. Values are pickled so requests never share mutable objects
+    """
+
+    def __init__(self, max_entries: int = 10000, timeout: float = 60):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+        return pickle.loads(value)
+
+    def set(self, key, value):
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCache:
+    """
+    Stores values in one of settings.CACHES, shared between processes if the backend is.
+    Keys carry a generation of key_prefix, clear() bumps it instead of clearing the whole alias
+    """
+
+    def __init__(self, alias: str = "default", timeout: float = 60, key_prefix: str = ""):
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def make_key(self, key) -> str:
+        return f"{self.key_prefix}{get_generation(self.key_prefix, self.cache)}:{key}"
+
+    def get(self, key, default=None):
+        return self.cache.get(self.make_key(key), default)
+
+    def set(self, key, value):
+        self.cache.set(self.make_key(key), value, self.timeout)
+
+    def delete(self, key):
+        self.cache.delete(self.make_key(key))
+
+    def clear(self):
+        # Entries of the previous generation are never read again and expire after `timeout`
+        bump_generation(self.key_prefix, self.cache)
+
+
+_instances = {}
+
+
+def get_cache(setting_name: str):
+    """
+    Returns the cache configured by settings.<setting_name> = {"BACKEND": "...", "OPTIONS": {...}}
+    """
+    if setting_name not in _instances:
+        config = getattr(settings, setting_name)
+        _instances[setting_name] = import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+    return _instances[setting_name]
+
+
+@receiver(setting_changed)
+def reset_cache(setting, **kwargs):
+    _instances.pop(setting, None)
+
+
+def response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def get_generation(name: str, cache=None) -> int:
+    """
+    Current generation of a group of cached responses (or other entries of `cache`). Starts from the current time,
+    so a counter evicted from the cache never comes back with a value that was already used
+    """
+    cache = response_cache() if cache is None else cache
+    key = f"generation:{name}"
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(name: str, cache=None):
+    """
+    Invalidates every cached response that depends on the generation
+    """
+    cache = response_cache() if cache is None else cache
+    key = f"generation:{name}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump_generation_on_commit(name: str):
+    """
+    bump_generation() once the current transaction is committed, at once outside of one. Bumped earlier, a concurrent
+    request could cache data from before the commit under the new generation, stale until RESPONSE_CACHE_TIMEOUT
+    """
+    transaction.on_commit(lambda: bump_generation(name))
+
+
+def cached_response(request, generations: list, build):
+    """
+    Returns the cached data of a GET response or builds it with build() and caches it.
+    The cache key and ETag depend on the URL, the accepted format and the generations
+    """
+    versions = ":".join(str(get_generation(name)) for name in generations)
+    digest = hashlib.md5(f"{request.build_absolute_uri()}|{request.accepted_renderer.format}|{versions}".encode()).hexdigest()
+    etag = f'"{digest}"'
+
+    if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    data = response_cache().get(f"response:{digest}")
+    if data is None:
+        response = build()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        response_cache().set(f"response:{digest}", response.data, settings.RESPONSE_CACHE_TIMEOUT)
+    else:
+        response = Response(data)
+
+    response["ETag"] = etag
+    return response
+
+
+def conditional_response(request, version: str, last_modified, build):
+    """
+    Answers 304 before build() is called when the client already has this version of the URL.
+    The weak ETag depends on the URL, the accepted format and the version, so nothing has to be serialized to compute it
+    """
+    digest = hashlib.md5(f"{request.build_absolute_uri()}|{request.accepted_renderer.format}|{version}".encode()).hexdigest()
+    headers = {"ETag": f'W/"{digest}"'}
+
+    # Last-Modified has whole seconds. Rounded up and only given once that second is over, so a later write, made after
+    # this response, always gets a greater one: two writes within a second can't make If-Modified-Since answer a stale 304
+    last_modified = math.ceil(last_modified.timestamp())
+    if last_modified <= time.time():
+        headers["Last-Modified"] = http_date(last_modified)
+    else:
+        last_modified = None
+
+    response = get_conditional_response(request, etag=headers["ETag"], last_modified=last_modified)
+    if response is not None:
+        if response.status_code == status.HTTP_304_NOT_MODIFIED:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return response
+
+    response = build()
+    if response.status_code == status.HTTP_200_OK:
+        for name, value in headers.items():
+            response[name] = value
+    return response
+
+
+class GenreIndex:
+    """
+    In-process genre name -> id map. Reloaded after local Genre writes (see book_review_app.signals)
+    and every `timeout` seconds to pick up writes made by other processes
+    """
+
+    def __init__(self, timeout: float = 300):
+        self.timeout = timeout
+        self._ids = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, name: str):
+        with self._lock:
+            if self._ids is None or self._loaded_at + self.timeout <= time.monotonic():
+                self._ids = dict(models.Genre.objects.values_list("name", "id"))
+                self._loaded_at = time.monotonic()
+            genre_id = self._ids.get(name)
+
+        if genre_id is None:
+            # Might have been created by another process since the last reload
+            genre_id = models.Genre.objects.filter(name=name).values_list("id", flat=True).first()
+            if genre_id is not None:
+                with self._lock:
+                    if self._ids is not None:
+                        self._ids[name] = genre_id
+        return genre_id
+
+    def invalidate(self):
+        with self._lock:
+            self._ids = None
+
+
+genre_index = GenreIndex()
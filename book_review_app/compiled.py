@@ -0,0 +1,141 @@
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+# to_representation() of these returns database values as they are
+PLAIN_FIELDS = (serializers.IntegerField, serializers.CharField, serializers.BooleanField, serializers.ReadOnlyField)
+
+
+class CompiledSerializer:
+    """
+    Read-only equivalent of a ModelSerializer working on .values() rows. Every field is compiled once into
+    (name, column, converter), so a row is represented without DRF's per-field get_attribute() and to_representation().
+    Produces the same JSON as the serializer, see test_compiled
+    """
+
+    def __init__(self, serializer_class, fields: tuple = None):
+        serializer = serializer_class()
+        self.model = serializer_class.Meta.model
+        self.columns = [self.model._meta.pk.attname]
+        self.fields = []  # (name, column, field)
+        self.nested = []  # (name, compiled child, column of the child pointing to the row)
+
+        for name, field in serializer.fields.items():
+            if field.write_only or (fields is not None and name not in fields):
+                continue
+            if isinstance(field, serializers.ListSerializer):
+                relation = self.model._meta.get_field(field.source)
+                child = CompiledSerializer(type(field.child))
+                child.add_column(relation.field.attname)
+                self.nested.append((name, child, relation.field.attname))
+                continue
+
+            column = self.get_column(serializer_class, name, field)
+            self.add_column(column)
+            self.fields.append((name, column, field))
+
+    def get_column(self, serializer_class, name: str, field) -> str:
+        if isinstance(field, serializers.RelatedField) and field.use_pk_only_optimization():
+            return self.model._meta.get_field(field.source).attname
+        if isinstance(field, (*PLAIN_FIELDS, serializers.DateTimeField, serializers.DateField, serializers.TimeField, serializers.DecimalField)):
+            if "." not in field.source and field.source != "*":
+                return self.model._meta.get_field(field.source).attname
+        raise ImproperlyConfigured(f"{serializer_class.__name__}.{name} ({type(field).__name__}) can't be compiled")
+
+    def add_column(self, column: str):
+        if column not in self.columns:
+            self.columns.append(column)
+
+    def get_converter(self, field, field_timezone):
+        """
+        Function turning a not None column value into the field representation, None if the value is represented as is
+        """
+        if isinstance(field, serializers.RelatedField) or isinstance(field, PLAIN_FIELDS):
+            return None
+
+        if isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+            if output_format is not None and output_format.lower() == ISO_8601 and not hasattr(field, "timezone"):
+                return lambda value: format_datetime(value, field_timezone)
+        elif isinstance(field, serializers.DateField):
+            output_format = getattr(field, "format", api_settings.DATE_FORMAT)
+            if output_format is not None and output_format.lower() == ISO_8601:
+                return lambda value: value.isoformat()
+        elif isinstance(field, serializers.TimeField):
+            output_format = getattr(field, "format", api_settings.TIME_FORMAT)
+            if output_format is not None and output_format.lower() == ISO_8601:
+                return lambda value: value.isoformat()
+        return field.to_representation
+
+    def values(self, queryset, ordering=()):
+        """
+        Rows for represent(). Columns the queryset is ordered by are added for cursor pagination
+        """
+        columns = list(self.columns)
+        for name in ordering:
+            if name.lstrip("-") not in columns:
+                columns.append(name.lstrip("-"))
+        return queryset.prefetch_related(None).values(*columns)
+
+    def represent(self, rows) -> list:
+        rows = list(rows)
+        field_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        fields = [(name, column, self.get_converter(field, field_timezone)) for name, column, field in self.fields]
+
+        children = {}
+        pk = self.model._meta.pk.attname
+        ids = [row[pk] for row in rows]
+        for name, child, column in self.nested:
+            # Same query as prefetch_related() of the relation makes
+            child_rows = list(child.values(child.model._default_manager.filter(**{f"{column}__in": ids})))
+            grouped = defaultdict(list)
+            for child_row, item in zip(child_rows, child.represent(child_rows)):
+                grouped[child_row[column]].append(item)
+            children[name] = grouped
+
+        items = []
+        for row in rows:
+            item = {}
+            for name, column, convert in fields:
+                value = row[column]
+                item[name] = value if convert is None or value is None else convert(value)
+            for name, grouped in children.items():
+                item[name] = grouped.get(row[pk], [])
+            items.append(item)
+        return items
+
+    def paginate(self, paginator, queryset, request, view) -> list:
+        """
+        Represented page of a cursor paginated queryset
+        """
+        rows = paginator.paginate_queryset(self.values(queryset, paginator.get_ordering(request, queryset, view)), request, view=view)
+        return self.represent(rows)
+
+
+def format_datetime(value, field_timezone) -> str:
+    # Same as DateTimeField.to_representation() with the ISO 8601 format
+    if field_timezone is not None:
+        value = value.astimezone(field_timezone) if timezone.is_aware(value) else timezone.make_aware(value, field_timezone)
+    elif timezone.is_aware(value):
+        value = timezone.make_naive(value, timezone.utc)
+    value = value.isoformat()
+    if value.endswith("+00:00"):
+        value = value[:-6] + "Z"
+    return value
+
+
+@lru_cache(maxsize=None)
+def _compile(serializer_class, fields: tuple) -> CompiledSerializer:
+    return CompiledSerializer(serializer_class, fields)
+
+
+def compile_serializer(serializer_class, fields: list = None) -> CompiledSerializer:
+    """
+    Compiled serializers are cached per serializer class and set of fields
+    """
+    return _compile(serializer_class, tuple(fields) if fields is not None else None)
@@ -1,7 +1,23 @@
 import pytest
+from django.core.cache import caches
 from rest_framework.test import APIClient
 
+from book_review_app.authentication import token_cache
+from book_review_app.cache import genre_index, get_cache
+from book_review_app.metrics import registry
+
 
 @pytest.fixture
 def api_client():
     return APIClient
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Cached responses, tokens, genre ids, throttling buckets and request metrics would otherwise leak between tests reusing the same ids
+    for cache in caches.all():
+        cache.clear()
+    token_cache().clear()
+    genre_index.invalidate()
+    get_cache("THROTTLE_STORE").clear()
+    registry.clear()
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+
+from book_review_app.compiled import compile_serializer
+from book_review_app.renderers import FastJSONRenderer
+from book_review_app.serializers import BookSerializer
+
+
+def iter_books_ndjson(queryset, chunk_size: int):
+    """
+    Yields books with inlined comments as NDJSON, one book per line.
+
+    Books are read in keyset chunks by id, so only one chunk (and its comments) is kept in memory.
+    QuerySet.iterator() ignores prefetch_related on Django 4.0, that's why chunks are prefetched by hand.
+    """
+    renderer = FastJSONRenderer()
+    queryset = queryset.order_by("id")
+    last_id = None
+
+    while True:
+        chunk_queryset = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        if settings.COMPILED_SERIALIZERS:
+            compiled = compile_serializer(BookSerializer)
+            chunk = list(compiled.values(chunk_queryset)[:chunk_size])
+            books = compiled.represent(chunk)
+            last_id = chunk[-1]["id"] if chunk else None
+        else:
+            chunk = list(chunk_queryset[:chunk_size])
+            prefetch_related_objects(chunk, "comments")
+            books = BookSerializer(chunk, many=True).data
+            last_id = chunk[-1].id if chunk else None
+
+        if not chunk:
+            return
+        for book in books:
+            yield renderer.render(book) + b"\n"
@@ -0,0 +1,96 @@
+from django.utils.dateparse import parse_datetime
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from rest_framework.serializers import ValidationError
+
+# Greater than any character, "<prefix>" <= title < "<prefix><MAX_CHAR>" matches every title starting with <prefix>
+MAX_CHAR = "\U0010ffff"
+
+
+def _parse_int(params, name: str):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: ["A valid integer is required."]})
+
+
+def _parse_datetime(params, name: str):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        parsed = parse_datetime(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: ["A valid datetime is required."]})
+    return parsed
+
+
+def filter_books(queryset, params):
+    """
+    Filters books by query params, every filter is backed by an index (see Book.Meta.indexes):
+    ?genre=<id>&author=<id>&year=<year>&year_min=<year>&year_max=<year>
+    &published_after=<datetime>&published_before=<datetime>&search=<title prefix>
+    """
+    genre = _parse_int(params, "genre")
+    if genre is not None:
+        queryset = queryset.filter(genre_id=genre)
+
+    author = _parse_int(params, "author")
+    if author is not None:
+        queryset = queryset.filter(author_id=author)
+
+    year = _parse_int(params, "year")
+    if year is not None:
+        queryset = queryset.filter(year=year)
+
+    year_min = _parse_int(params, "year_min")
+    if year_min is not None:
+        queryset = queryset.filter(year__gte=year_min)
+
+    year_max = _parse_int(params, "year_max")
+    if year_max is not None:
+        queryset = queryset.filter(year__lte=year_max)
+
+    published_after = _parse_datetime(params, "published_after")
+    if published_after is not None:
+        queryset = queryset.filter(publication_date__gte=published_after)
+
+    published_before = _parse_datetime(params, "published_before")
+    if published_before is not None:
+        queryset = queryset.filter(publication_date__lt=published_before)
+
+    search = params.get("search")
+    if search:
+        # A range instead of startswith: SQLite's LIKE is case-insensitive and can't use the title index
+        queryset = queryset.filter(title__gte=search, title__lt=search + MAX_CHAR)
+
+    return queryset
+
+
+class BookFilterBackend(BaseFilterBackend):
+    def filter_queryset(self, request, queryset, view):
+        return filter_books(queryset, request.query_params)
+
+
+class IndexedOrderingFilter(OrderingFilter):
+    """
+    ?ordering=<field> or ?ordering=-<field> with a single field of view.ordering_fields, id is added as a tie-breaker
+    so cursor pagination gets a deterministic order. Cursor pagination positions by the first field only and skips
+    the rows sharing its value with OFFSET, so every field needs a (field, id) index and mostly distinct values.
+    Anything else falls back to the default ordering
+    """
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        if len(fields) != 1:
+            return []
+        return super().remove_invalid_fields(queryset, fields, view, request)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if not any(field.lstrip("-") in ("id", "pk") for field in ordering):
+            ordering.append("-id" if ordering[0].startswith("-") else "id")
+        return ordering
@@ -0,0 +1,108 @@
+import asyncio
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from rest_framework.authtoken.models import Token
+
+from book_review_api.asgi import application as asgi_application
+from book_review_api.wsgi import application as wsgi_application
+
+
+class Command(BaseCommand):
+    help = (
+        "Serves the same read endpoint to slow clients through wsgi.py (threaded server) and through asgi.py in process, "
+        "and compares throughput and latency (run on a database seeded by createusers)"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--path", default="/api/books/")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, default=50, help="Clients connected at once")
+        parser.add_argument("--threads", type=int, default=8, help="Threads of the WSGI server")
+        parser.add_argument("--delay", type=float, default=0.2, help="Seconds a slow client takes to read the response")
+
+        return super().add_arguments(parser)
+
+    def handle(self, *args, **options):
+        token = Token.objects.first()
+        if token is None:
+            raise CommandError("Database is empty, seed it with `manage.py createusers` first")
+        self.authorization = f"Token {token.key}"
+        self.delay = options["delay"]
+
+        path = options["path"]
+        results = {
+            f"wsgi {path}, {options['threads']} threads": self.run_wsgi(path, options["requests"], options["threads"]),
+            f"asgi {path}": asyncio.run(self.run_asgi(path, options["requests"], options["concurrency"])),
+        }
+
+        for name, (statuses, elapsed, latencies) in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            if set(statuses) != {200}:
+                self.stdout.write(self.style.WARNING(f"  statuses: {sorted(set(statuses))}"))
+            latencies.sort()
+            self.stdout.write(
+                f"  {len(statuses) / elapsed:.1f} req/s, latency p50 {statistics.median(latencies) * 1000:.0f} ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms"
+            )
+
+    def run_wsgi(self, path: str, requests: int, threads: int):
+        def request():
+            start = time.perf_counter()
+            environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, "HTTP_HOST": "localhost", "HTTP_AUTHORIZATION": self.authorization}
+            environ["wsgi.input"] = io.BytesIO()
+            setup_testing_defaults(environ)
+
+            statuses = []
+            body = wsgi_application(environ, lambda status, headers: statuses.append(int(status.split()[0])))
+            for _ in body:
+                pass
+            body.close()
+            time.sleep(self.delay)  # a threaded server's thread is busy writing to the slow client
+            return statuses[0], time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            done = list(executor.map(lambda _: request(), range(requests)))
+        return [status for status, _ in done], time.perf_counter() - start, [latency for _, latency in done]
+
+    async def run_asgi(self, path: str, requests: int, concurrency: int):
+        clients = asyncio.Semaphore(concurrency)
+
+        async def request():
+            async with clients:
+                start = time.perf_counter()
+                scope = {
+                    "type": "http",
+                    "asgi": {"version": "3.0"},
+                    "http_version": "1.1",
+                    "method": "GET",
+                    "scheme": "http",
+                    "path": path,
+                    "query_string": b"",
+                    "headers": [(b"host", b"localhost"), (b"authorization", self.authorization.encode())],
+                    "server": ("localhost", 80),
+                    "client": ("127.0.0.1", 0),
+                }
+                statuses = []
+
+                async def receive():
+                    return {"type": "http.request", "body": b"", "more_body": False}
+
+                async def send(message):
+                    if message["type"] == "http.response.start":
+                        statuses.append(message["status"])
+                    elif not message.get("more_body"):
+                        # The view's thread is already free, the event loop serves other clients meanwhile
+                        await asyncio.sleep(self.delay)
+
+                await asgi_application(scope, receive, send)
+                return statuses[0], time.perf_counter() - start
+
+        start = time.perf_counter()
+        done = await asyncio.gather(*(request() for _ in range(requests)))
+        return [status for status, _ in done], time.perf_counter() - start, [latency for _, latency in done]
@@ -0,0 +1,56 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from book_review_app.models import Book, Comment, Library
+from book_review_app.renderers import FastJSONParser, FastJSONRenderer, orjson
+from book_review_app.serializers import BookSerializer
+
+
+class Command(BaseCommand):
+    help = "Compares JSONRenderer/JSONParser with FastJSONRenderer/FastJSONParser on large payloads (run on a database seeded by createusers)"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--books", type=int, default=500, help="Books (with their comments) in the serialized payload")
+        parser.add_argument("--rows", type=int, default=5000, help="Comment and library .values() rows in the raw payloads")
+        parser.add_argument("--repeat", type=int, default=20, help="How many times every payload is rendered and parsed")
+
+        return super().add_arguments(parser)
+
+    def get_payloads(self, books: int, rows: int) -> dict:
+        queryset = Book.objects.order_by("id").prefetch_related("comments")[:books]
+        if not queryset:
+            raise CommandError("Database is empty, seed it with `manage.py createusers` first")
+
+        return {
+            f"{books} serialized books": BookSerializer(queryset, many=True).data,
+            # datetime, Decimal and time values go through the encoder
+            f"{rows} comment rows": list(Comment.objects.order_by("id").values()[:rows]),
+            f"{rows} library rows": list(Library.objects.order_by("id").values()[:rows]),
+        }
+
+    def measure(self, function, repeat: int) -> float:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            function()
+        return (time.perf_counter() - start) / repeat * 1000
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed, FastJSONRenderer falls back to JSONRenderer"))
+
+        repeat = options["repeat"]
+        for name, data in self.get_payloads(options["books"], options["rows"]).items():
+            body = JSONRenderer().render(data)
+            if FastJSONRenderer().render(data) != body:
+                raise CommandError(f"{name}: FastJSONRenderer output differs from JSONRenderer")
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}, {len(body) / 1024:.0f} KiB"))
+            for title, renderer, parser in (("stdlib", JSONRenderer(), JSONParser()), ("fast", FastJSONRenderer(), FastJSONParser())):
+                rendering = self.measure(lambda: renderer.render(data), repeat)
+                parsing = self.measure(lambda: parser.parse(io.BytesIO(body)), repeat)
+                self.stdout.write(f"  {title}: render {rendering:.3f} ms, parse {parsing:.3f} ms")
+            self.stdout.write("")
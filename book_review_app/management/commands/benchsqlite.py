@@ -0,0 +1,60 @@
+import json
+import logging
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection, connections
+from django.test import override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the same concurrent read/write mix of `loadtest` in process with Django's SQLite defaults and with SQLITE_PRAGMAS "
+        "and WriteRetryMixin retries, and compares throughput, errors and latency (run on a database seeded by createusers, adds comments to it)"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--mix", default="book_list=40,book_comments=20,post_comment=40", help="Scenarios of `loadtest`")
+
+        return super().add_arguments(parser)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The default database is not SQLite")
+
+        profiles = {
+            # Rollback journal, the busy timeout of Python's sqlite3 (5 s), every "database is locked" is a 500
+            "django defaults": {"SQLITE_PRAGMAS": {"journal_mode": "delete"}, "WRITE_RETRY_ATTEMPTS": 1},
+            "tuned": {"SQLITE_PRAGMAS": settings.SQLITE_PRAGMAS, "WRITE_RETRY_ATTEMPTS": settings.WRITE_RETRY_ATTEMPTS},
+        }
+        for name, profile in profiles.items():
+            with override_settings(**profile):
+                # The journal mode is switched by the only open connection, the threads of loadtest connect afterwards
+                connections.close_all()
+                connection.ensure_connection()
+                report = self.run_loadtest(options)
+            connections.close_all()
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {report['throughput']} req/s"))
+            for route, result in report["routes"].items():
+                errors = sum(count for status, count in result["statuses"].items() if int(status) >= 400)
+                self.stdout.write(
+                    f"  {route}: {result['throughput']} req/s, {errors} errors, "
+                    f"latency p50 {result['p50_ms']:.0f} ms, p95 {result['p95_ms']:.0f} ms, p99 {result['p99_ms']:.0f} ms"
+                )
+
+    def run_loadtest(self, options: dict) -> dict:
+        stdout = StringIO()
+        logger = logging.getLogger("django.request")
+        level, logger.level = logger.level, logging.CRITICAL  # the 500s of locked writes are counted, not logged
+        try:
+            call_command(
+                "loadtest", requests=options["requests"], concurrency=options["concurrency"], mix=options["mix"], no_throttle=True, stdout=stdout, stderr=StringIO()
+            )
+        finally:
+            logger.level = level
+        return json.loads(stdout.getvalue())
@@ -1,14 +1,47 @@
+import os
 import random
+from contextlib import contextmanager
+from multiprocessing import Pool
 
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand, CommandParser
-from faker import Faker
+from django.db import transaction
 from rest_framework.authtoken.models import Token
 from tqdm import tqdm
 
 from book_review_app import utils
 from book_review_app.models import AuthorUser, Book, Comment, Genre, Library
 
-fake = Faker()
+
+def generate_users(count: int) -> list:
+    users = []
+    for _ in range(count):
+        profile = utils.get_new_user_data()
+        profile.pop("password")
+        library = {"name": utils.fake.company(), "address": utils.fake.address(), "from_hour": "9:30", "to_hour": "21:00"}
+        users.append((profile, library))
+    return users
+
+
+def generate_books(count: int) -> list:
+    return [utils.get_new_book_data() for _ in range(count)]
+
+
+def generate_comments(count: int) -> list:
+    return [utils.fake.text() for _ in range(count)]
+
+
+def init_worker():
+    # Forked workers inherit the same random state, reseed them so they don't generate identical rows
+    seed = int.from_bytes(os.urandom(4), "little")
+    random.seed(seed)
+    utils.fake.seed_instance(seed)
+
+
+def split(total: int, size: int):
+    while total > 0:
+        yield min(total, size)
+        total -= size
 
 
 class Command(BaseCommand):
@@ -18,34 +51,98 @@ class Command(BaseCommand):
         parser.add_argument("--users", type=int, required=True)
         parser.add_argument("--books", type=int, required=True)
         parser.add_argument("--comments", type=int, required=True)
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per INSERT and per transaction")
+        parser.add_argument("--workers", type=int, default=1, help="Processes used to generate fake data")
 
         return super().add_arguments(parser)
 
+    @contextmanager
+    def generator(self, workers: int):
+        if workers > 1:
+            with Pool(workers, initializer=init_worker) as pool:
+                yield pool.imap
+        else:
+            yield map
+
     def handle(self, *args, **options):
-        print("Долго... n^2 всё таки...")
         utils.create_genres()
 
-        genres = Genre.objects.all()
-        books = []
-        users = []
+        self.batch_size = options["batch_size"]
+        # Books of a batch are generated in this many rows per task, so every worker gets a share of the batch
+        self.books_per_task = max(1, -(-self.batch_size // options["workers"]))
+        self.genre_ids = list(Genre.objects.values_list("id", flat=True))
+        # PBKDF2 is slow by design, every seeded user has the same password anyway
+        self.password = make_password(utils.get_new_user_data()["password"])
 
-        for _ in tqdm(range(options["users"])):
-            profile = utils.get_new_user_data()
-            user = AuthorUser.objects.create_user(**profile)
-            users.append(user)
-            Token.objects.create(user=user)
-            Library.objects.create(author=user, name=fake.company(), address=fake.address(), from_hour="9:30", to_hour="21:00")
-
-            for _ in range(options["books"]):
-                book = utils.get_new_book_data()
-                books.append(Book.objects.create(author=user, genre=random.choice(genres), **book))
-
-        for book in tqdm(books):
-            for _ in range(options["comments"]):
-                _authors = AuthorUser.objects.filter(id__in=[u.id for u in users]).exclude(id=book.author.id)
-                comment_creator = random.choice(_authors)
-                Comment.objects.create(author=comment_creator, book=book, text=fake.text())
+        with self.generator(options["workers"]) as imap:
+            user_ids = self.create_users(imap, options["users"])
+            self.create_books(imap, user_ids, options["books"], options["comments"])
 
         print(
             f"{options['users']} authors created each with {options['books']} books. Every book now has {options['comments']} comments from random author (excluding book creator)!"
         )
+
+    def create_users(self, imap, count: int) -> list:
+        user_ids = []
+
+        with tqdm(total=count, desc="users") as progress:
+            for chunk in imap(generate_users, split(count, self.batch_size)):
+                with transaction.atomic():
+                    users = AuthorUser.objects.bulk_create([AuthorUser(password=self.password, **profile) for profile, _ in chunk])
+                    if users[0].pk is None:
+                        usernames = [user.username for user in users]
+                        ids = dict(AuthorUser.objects.filter(username__in=usernames).values_list("username", "id"))
+                        for user in users:
+                            user.pk = ids[user.username]
+
+                    Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in users])
+                    Library.objects.bulk_create([Library(author=user, **library) for user, (_, library) in zip(users, chunk)])
+
+                user_ids.extend(user.pk for user in users)
+                progress.update(len(chunk))
+
+        return user_ids
+
+    def create_books(self, imap, user_ids: list, books_per_user: int, comments_per_book: int):
+        if not books_per_user:
+            return
+
+        users_per_batch = max(1, self.batch_size // books_per_user)
+
+        for start in tqdm(range(0, len(user_ids), users_per_batch), desc="books"):
+            authors = user_ids[start : start + users_per_batch]
+            book_data = [data for chunk in imap(generate_books, split(len(authors) * books_per_user, self.books_per_task)) for data in chunk]
+
+            with transaction.atomic():
+                books = [
+                    Book(author_id=author_id, genre_id=random.choice(self.genre_ids), **data)
+                    for author_id, data in zip((a for a in authors for _ in range(books_per_user)), book_data)
+                ]
+                books = Book.objects.bulk_create(books, batch_size=self.batch_size)
+                if books[0].pk is None:
+                    books = list(Book.objects.filter(author_id__in=authors).only("id", "author_id"))
+
+            self.create_comments(imap, user_ids, books, comments_per_book)
+
+    def create_comments(self, imap, user_ids: list, books: list, comments_per_book: int):
+        if not comments_per_book or len(user_ids) < 2:
+            return
+
+        # (book_id, comment author id) pairs, the author of the book never comments on it
+        pairs = []
+        for book in books:
+            for _ in range(comments_per_book):
+                author_id = random.choice(user_ids)
+                while author_id == book.author_id:
+                    author_id = random.choice(user_ids)
+                pairs.append((book.pk, author_id))
+
+        offset = 0
+        for texts in imap(generate_comments, split(len(pairs), self.batch_size)):
+            with transaction.atomic():
+                Comment.objects.bulk_create(
+                    [Comment(book_id=book_id, author_id=author_id, text=text) for (book_id, author_id), text in zip(pairs[offset:], texts)]
+                )
+            offset += len(texts)
+
+        Book.objects.filter(pk__in=[book.pk for book in books]).recount_comments()
@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection, transaction
+
+from book_review_app.models import Book, Comment, Library
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Shows query plans and timings of the hot queries without and with Meta.indexes (run on a database seeded by createusers)"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--repeat", type=int, default=20, help="How many times every query is executed for timing")
+
+        return super().add_arguments(parser)
+
+    def get_queries(self) -> dict:
+        book = Book.objects.filter(comments__isnull=False).order_by("id").first()
+        if book is None:
+            raise CommandError("Database is empty, seed it with `manage.py createusers` first")
+
+        return {
+            "book list": Book.objects.order_by("-publication_date", "-id")[:51],
+            "genre page": Book.objects.filter(genre_id=book.genre_id).order_by("-publication_date", "-id")[:51],
+            "comments of a book": Comment.objects.filter(book_id=book.id).order_by("-creation_date", "-id")[:51],
+            "books of an author": Book.objects.filter(author_id=book.author_id).order_by("id")[:51],
+            "libraries of an author": Library.objects.filter(author_id=book.author_id).order_by("id")[:51],
+            "books by year": Book.objects.filter(year=book.year).order_by("id")[:51],
+            "books by title": Book.objects.filter(title=book.title).order_by("id")[:51],
+            "books ordered by title": Book.objects.order_by("title", "id")[:51],
+        }
+
+    def measure(self, queries: dict, repeat: int) -> dict:
+        results = {}
+        for name, queryset in queries.items():
+            plan = queryset.explain()
+            start = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            results[name] = (plan, (time.perf_counter() - start) / repeat * 1000)
+        return results
+
+    def handle(self, *args, **options):
+        queries = self.get_queries()
+        indexes = [(model, index) for model in (Book, Comment, Library) for index in model._meta.indexes]
+
+        # Only the SQL template is needed, the SQLite schema editor can't be entered inside atomic()
+        editor = connection.schema_editor()
+        drop_sql = [
+            editor.sql_delete_index % {"name": editor.quote_name(index.name), "table": editor.quote_name(model._meta.db_table)}
+            for model, index in indexes
+        ]
+
+        # Indexes are dropped inside a transaction that is rolled back (DDL is transactional on SQLite and PostgreSQL)
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for sql in drop_sql:
+                        cursor.execute(sql)
+                without_indexes = self.measure(queries, options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+        with_indexes = self.measure(queries, options["repeat"])
+
+        for name, queryset in queries.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(str(queryset.query))
+            for title, (plan, elapsed) in (("without indexes", without_indexes[name]), ("with indexes", with_indexes[name])):
+                self.stdout.write(f"  {title}: {elapsed:.3f} ms")
+                for line in plan.splitlines():
+                    self.stdout.write(f"    {line}")
+            self.stdout.write("")
@@ -0,0 +1,190 @@
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.test import Client, override_settings
+from django.urls import Resolver404, resolve
+from rest_framework.authtoken.models import Token
+
+from book_review_app import utils
+from book_review_app.models import Book, Genre
+
+# Default weights of the scenarios, roughly the traffic of a review site: mostly reads, some comments, few signups
+DEFAULT_MIX = "book_list=35,book_comments=30,genre_page=20,post_comment=10,register_login=5"
+
+
+class InProcessClient:
+    """
+    Django's test client, requests go through the whole middleware stack without a server
+    """
+
+    def __init__(self):
+        # localhost passes the empty ALLOWED_HOSTS of DEBUG
+        hosts = [host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"]
+        # Errors of the views are reported as 500s like a server would, not raised
+        self.client = Client(SERVER_NAME=hosts[0] if hosts else "localhost", raise_request_exception=False)
+
+    def request(self, method: str, path: str, token: str = None, data=None) -> tuple:
+        extra = {"HTTP_AUTHORIZATION": f"Token {token}"} if token else {}
+        if data is not None:
+            extra.update(data=json.dumps(data), content_type="application/json")
+        response = self.client.generic(method, path, **extra)
+        return response.status_code, response.content
+
+
+class HTTPClient:
+    """
+    Keep-alive session to a running server
+    """
+
+    def __init__(self, base_url: str):
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+
+    def request(self, method: str, path: str, token: str = None, data=None) -> tuple:
+        headers = {"Authorization": f"Token {token}"} if token else {}
+        response = self.session.request(method, self.base_url + path, json=data, headers=headers)
+        return response.status_code, response.content
+
+
+def percentile(latencies: list, percent: float) -> float:
+    """
+    Nearest-rank percentile of sorted latencies
+    """
+    return latencies[max(0, -(-len(latencies) * percent // 100) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives a concurrent mix of realistic scenarios against the API in process (Django test client) or against a running server, "
+        "and reports throughput and latency percentiles per route as JSON"
+    )
+
+    scenarios = ("book_list", "book_comments", "genre_page", "post_comment", "register_login")
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--url", help="Base URL of a server using the same database, e.g. http://127.0.0.1:8000. In process if omitted")
+        parser.add_argument("--requests", type=int, default=1000, help="Scenarios to run (register_login makes two requests)")
+        parser.add_argument("--concurrency", type=int, default=8, help="Scenarios running at once")
+        parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weights of the scenarios, default {DEFAULT_MIX}")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, the same seed runs the same scenarios on the same objects")
+        parser.add_argument("--no-throttle", action="store_true", help="Disable throttling (in process only)")
+        parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+        parser.add_argument("--users", type=int, help="Seed the database with `createusers` first, with this many users")
+        parser.add_argument("--books", type=int, default=10, help="Books per seeded user")
+        parser.add_argument("--comments", type=int, default=3, help="Comments per seeded book and author")
+
+        return super().add_arguments(parser)
+
+    def handle(self, *args, **options):
+        self.mix = self.parse_mix(options["mix"])
+        if options["users"]:
+            call_command("createusers", users=options["users"], books=options["books"], comments=options["comments"], stdout=self.stderr)
+
+        self.tokens = list(Token.objects.values_list("key", flat=True)[:1000])
+        self.book_ids = list(Book.objects.values_list("id", flat=True)[:10000])
+        self.genre_ids = list(Genre.objects.values_list("id", flat=True))
+        if not self.tokens or not self.book_ids:
+            raise CommandError("Database is empty, seed it with `manage.py createusers` or `--users` first")
+
+        if options["url"]:
+            self.new_client = lambda: HTTPClient(options["url"])
+        else:
+            self.new_client = InProcessClient
+        self.local = threading.local()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.lock = threading.Lock()
+
+        throttling = {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {}}
+        with override_settings(REST_FRAMEWORK=throttling) if options["no_throttle"] else nullcontext():
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+                list(executor.map(lambda i: self.run_scenario(random.Random(f"{options['seed']}:{i}")), range(options["requests"])))
+            elapsed = time.perf_counter() - start
+
+        report = self.get_report(options, elapsed)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(report, file, indent=2)
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+    def parse_mix(self, mix: str) -> dict:
+        weights = {}
+        for item in mix.split(","):
+            name, _, weight = item.partition("=")
+            if name.strip() not in self.scenarios or not weight.strip().isdigit():
+                raise CommandError(f"Bad --mix item {item!r}, expected <scenario>=<weight> with a scenario of {', '.join(self.scenarios)}")
+            weights[name.strip()] = int(weight)
+        return weights
+
+    def run_scenario(self, rng: random.Random):
+        if not hasattr(self.local, "client"):
+            self.local.client = self.new_client()
+        name = rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        getattr(self, name)(rng, rng.choice(self.tokens))
+
+    def call(self, method: str, path: str, token: str = None, data=None) -> tuple:
+        start = time.perf_counter()
+        status, content = self.local.client.request(method, path, token, data)
+        latency = time.perf_counter() - start
+
+        try:
+            route = f"{method} {resolve(path.partition('?')[0]).view_name}"
+        except Resolver404:
+            route = f"{method} {path}"
+        with self.lock:
+            self.latencies[route].append(latency)
+            self.statuses[route][status] += 1
+        return status, content
+
+    def book_list(self, rng: random.Random, token: str):
+        self.call("GET", "/api/books/", token)
+
+    def book_comments(self, rng: random.Random, token: str):
+        self.call("GET", f"/api/books/{rng.choice(self.book_ids)}/comments/", token)
+
+    def genre_page(self, rng: random.Random, token: str):
+        self.call("GET", f"/api/genres/{rng.choice(self.genre_ids)}/", token)
+
+    def post_comment(self, rng: random.Random, token: str):
+        self.call("POST", f"/api/books/{rng.choice(self.book_ids)}/comments/", token, {"text": utils.fake.text(max_nb_chars=200)})
+
+    def register_login(self, rng: random.Random, token: str):
+        user = utils.get_new_user_data()
+        status, _ = self.call("POST", "/api/v1/register/", data=user)
+        if status == 201:
+            self.call("POST", "/api/v1/api-token-auth/", data={"username": user["username"], "password": user["password"]})
+
+    def get_report(self, options: dict, elapsed: float) -> dict:
+        routes = {}
+        for route, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            routes[route] = {
+                "requests": len(latencies),
+                "statuses": {str(status): count for status, count in sorted(self.statuses[route].items())},
+                "throughput": round(len(latencies) / elapsed, 1),
+                **{f"p{percent}_ms": round(percentile(latencies, percent) * 1000, 2) for percent in (50, 95, 99)},
+            }
+        requests = sum(route["requests"] for route in routes.values())
+        return {
+            "target": options["url"] or "in-process",
+            "scenarios": options["requests"],
+            "concurrency": options["concurrency"],
+            "mix": self.mix,
+            "seed": options["seed"],
+            "elapsed_s": round(elapsed, 3),
+            "requests": requests,
+            "throughput": round(requests / elapsed, 1),
+            "routes": routes,
+        }
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandParser
+from tqdm import tqdm
+
+from book_review_app import search
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index of book titles and comments (e.g. after createusers, which bypasses signals)"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+        return super().add_arguments(parser)
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        backend.clear()
+
+        for kind, (_, model, field) in search.KINDS.items():
+            rows = model.objects.order_by("id").values_list("id", field)
+            batch = []
+            for row in tqdm(rows.iterator(chunk_size=options["batch_size"]), total=rows.count(), desc=kind):
+                batch.append(row)
+                if len(batch) == options["batch_size"]:
+                    backend.index_many(kind, batch, created=True)
+                    batch = []
+            backend.index_many(kind, batch, created=True)
+
+        print(f"Search index rebuilt with {type(backend).__name__}")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+from tqdm import tqdm
+
+from book_review_app.models import Book
+
+
+class Command(BaseCommand):
+    help = "Recomputes Book.comment_count and Book.last_commented_at from comments"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--batch-size", type=int, default=1000, help="Books updated per transaction")
+
+        return super().add_arguments(parser)
+
+    def handle(self, *args, **options):
+        ids = list(Book.objects.order_by("id").values_list("id", flat=True))
+        batch_size = options["batch_size"]
+
+        for start in tqdm(range(0, len(ids), batch_size)):
+            batch = ids[start : start + batch_size]
+            with transaction.atomic():
+                Book.objects.filter(id__gte=batch[0], id__lte=batch[-1]).recount_comments()
+
+        print(f"Comment counters of {len(ids)} books recomputed")
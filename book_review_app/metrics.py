@@ -0,0 +1,116 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+
+# Upper bounds of the histogram buckets
+MILLISECOND_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Server-Timing / histogram order. auth, permission, throttle, serialize and render exclude the database time
+PHASES = ("auth", "permission", "throttle", "db", "serialize", "render", "total")
+
+
+class Timings:
+    """
+    Time spent by one request per phase, in seconds. Also a connection.execute_wrapper() counting queries
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.phases["db"] += time.perf_counter() - start
+            self.queries += 1
+
+    def add(self, phase: str, started: float, db_started: float):
+        """
+        Adds the time since `started` minus the database time since `db_started` to the phase
+        """
+        self.phases[phase] += time.perf_counter() - started - (self.phases["db"] - db_started)
+
+    def finish(self):
+        self.phases["total"] = time.perf_counter() - self.started
+
+    def header(self) -> str:
+        items = []
+        for phase, seconds in self.phases.items():
+            item = f"{phase};dur={seconds * 1000:.3f}"
+            if phase == "db":
+                item += f';desc="{self.queries} queries"'
+            items.append(item)
+        return ", ".join(items)
+
+
+# Timings of the request being handled. A context variable, so it follows the request into threads
+# started with asgiref's sync_to_async (and anything else that copies the context)
+current_timings = ContextVar("current_timings", default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    execute_wrapper of every connection (see signals.count_request_queries), adds the query to current_timings
+    """
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"count": self.count, "sum": round(self.sum, 3), "buckets": buckets}
+
+
+class MetricsRegistry:
+    """
+    Per process histograms of every phase (milliseconds) and of the query count, per route name
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = defaultdict(self.new_route)
+
+    @staticmethod
+    def new_route() -> dict:
+        return {**{phase: Histogram(MILLISECOND_BUCKETS) for phase in PHASES}, "queries": Histogram(QUERY_BUCKETS)}
+
+    def record(self, route: str, timings: Timings):
+        with self._lock:
+            histograms = self._routes[route]
+            for phase, seconds in timings.phases.items():
+                histograms[phase].observe(seconds * 1000)
+            histograms["queries"].observe(timings.queries)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {route: {name: histogram.as_dict() for name, histogram in histograms.items()} for route, histograms in sorted(self._routes.items())}
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+
+registry = MetricsRegistry()
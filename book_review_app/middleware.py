@@ -0,0 +1,30 @@
+from django.conf import settings
+
+from book_review_app.metrics import Timings, current_timings, registry
+
+
+class TimingMiddleware:
+    """
+    Measures every request: total time and database time and queries in any thread running in its context, plus the phases views
+    with mixins.TimingMixin report. Recorded per route name in metrics.registry, sent back as Server-Timing.
+    Should be the first middleware, so the total covers the others
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = request.timings = Timings()
+
+        token = current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        timings.finish()
+
+        match = request.resolver_match
+        registry.record(match.view_name if match else "<unresolved>", timings)
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = timings.header()
+        return response
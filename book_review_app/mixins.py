@@ -0,0 +1,181 @@
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import OperationalError, transaction
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import ValidationError
+
+from book_review_app.compiled import compile_serializer
+
+# Messages of SQLITE_BUSY and SQLITE_LOCKED, the latter may name the table after a colon
+LOCKED_ERRORS = ("database is locked", "database table is locked")
+
+
+def parse_fields(request, serializer_class):
+    """
+    Field names from ?fields=id,title, None if the parameter is missing. Every name must be one of serializer_class fields
+    """
+    if "fields" not in request.query_params:
+        return None
+
+    fields = [name.strip() for name in request.query_params["fields"].split(",") if name.strip()]
+    unknown = [name for name in fields if name not in serializer_class.Meta.fields]
+    if not fields or unknown:
+        raise ValidationError({"fields": [f"Must be a comma separated list of: {', '.join(serializer_class.Meta.fields)}."]})
+    return fields
+
+
+def only_fields(queryset, fields: list, ordering=()):
+    """
+    Selects only the columns behind the requested fields, plus the primary key and the columns the page is ordered by
+    """
+    opts = queryset.model._meta
+    columns = {opts.pk.name, *(name.lstrip("-") for name in ordering)}
+    for name in fields:
+        try:
+            field = opts.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if field.concrete:
+            columns.add(name)
+    return queryset.only(*columns)
+
+
+class SerializerPerActionMixin:
+    """
+    Picks the serializer from serializer_classes by action, e.g. a compact one for list and the full one for everything else
+    """
+
+    serializer_classes = {}
+
+    def get_serializer_class(self):
+        return self.serializer_classes.get(self.action, self.serializer_class)
+
+
+class SparseFieldsetMixin:
+    """
+    ?fields=id,title on list and retrieve serializes only the listed fields and selects only their columns.
+    The serializers must accept `fields` (see serializers.SparseFieldsMixin)
+    """
+
+    sparse_fieldset_actions = ("list", "retrieve")
+    sparse_fieldset_columns = ()  # selected whatever the fields are, e.g. the ones the view itself reads
+
+    def get_sparse_fields(self):
+        if self.action not in self.sparse_fieldset_actions:
+            return None
+        return parse_fields(self.request, self.get_serializer_class())
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs.setdefault("fields", fields)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+
+        ordering = ()
+        if self.action == "list" and hasattr(self.paginator, "get_ordering"):
+            # Cursor pagination reads the ordering columns of the last row of the page
+            ordering = self.paginator.get_ordering(self.request, queryset, self)
+        return only_fields(queryset, [*fields, *self.sparse_fieldset_columns], ordering)
+
+
+class CompiledListMixin:
+    """
+    With settings.COMPILED_SERIALIZERS list is represented by the compiled serializer (see book_review_app.compiled).
+    Goes together with SparseFieldsetMixin
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.COMPILED_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+
+        compiled = compile_serializer(self.get_serializer_class(), self.get_sparse_fields())
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.get_paginated_response(compiled.paginate(self.paginator, queryset, request, self))
+
+
+class TimingMixin:
+    """
+    Reports auth, permission, throttle, serialize (the rest of the view) and render time of DRF views
+    to the request timings of middleware.TimingMiddleware. Database time is left out of all of them
+    """
+
+    def measure(self, request, phase: str, method, *args):
+        timings = getattr(request, "timings", None)
+        if timings is None:
+            return method(*args)
+
+        started, db_started = time.perf_counter(), timings.phases["db"]
+        try:
+            return method(*args)
+        finally:
+            timings.add(phase, started, db_started)
+
+    def perform_authentication(self, request):
+        return self.measure(request, "auth", super().perform_authentication, request)
+
+    def check_permissions(self, request):
+        return self.measure(request, "permission", super().check_permissions, request)
+
+    def check_object_permissions(self, request, obj):
+        return self.measure(request, "permission", super().check_object_permissions, request, obj)
+
+    def check_throttles(self, request):
+        return self.measure(request, "throttle", super().check_throttles, request)
+
+    def dispatch(self, request, *args, **kwargs):
+        timings = getattr(request, "timings", None)
+        if timings is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        started, db_started = time.perf_counter(), timings.phases["db"]
+        measured = sum(timings.phases[phase] for phase in ("auth", "permission", "throttle"))
+        response = super().dispatch(request, *args, **kwargs)
+        timings.add("serialize", started, db_started)
+        timings.phases["serialize"] -= sum(timings.phases[phase] for phase in ("auth", "permission", "throttle")) - measured
+
+        if hasattr(response, "add_post_render_callback") and not response.is_rendered:
+            # Django renders the response right after the view returns
+            render_started, render_db_started = time.perf_counter(), timings.phases["db"]
+            response.add_post_render_callback(lambda response: timings.add("render", render_started, render_db_started))
+        return response
+
+
+class WriteRetryMixin:
+    """
+    Runs the handler of unsafe methods in a transaction, retried with exponential backoff while SQLite answers
+    "database is locked" (settings.WRITE_RETRY_ATTEMPTS, WRITE_RETRY_BACKOFF). A failed attempt is rolled back
+    as a whole, request.data is parsed once and reused by the next attempts.
+    Effects outside the database must be left to transaction.on_commit() by the handler and the signals it sends,
+    so only the attempt that commits has them. Throttling takes its token in initial(), before the retries
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        method = request.method.lower()
+        if request.method not in SAFE_METHODS and hasattr(self, method):
+            setattr(self, method, self.retrying(getattr(self, method)))
+
+    @staticmethod
+    def retrying(handler):
+        def retrying_handler(*args, **kwargs):
+            attempts = max(1, settings.WRITE_RETRY_ATTEMPTS)
+            for attempt in range(attempts):
+                try:
+                    with transaction.atomic():
+                        return handler(*args, **kwargs)
+                except OperationalError as error:
+                    if str(error).partition(":")[0] not in LOCKED_ERRORS or attempt + 1 == attempts:
+                        raise
+                # Jitter keeps the writers that failed together from retrying together
+                time.sleep(settings.WRITE_RETRY_BACKOFF * 2**attempt * random.uniform(0.5, 1.5))
+
+        return retrying_handler
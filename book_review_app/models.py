@@ -1,8 +1,11 @@
 from decimal import Decimal
 
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import F, OuterRef, Subquery, Value
 from django.db.models.deletion import CASCADE, PROTECT
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.sql import UpdateQuery
 from django.utils import timezone
 
 
@@ -32,6 +35,11 @@ class Library(models.Model):
     from_hour = models.TimeField()
     to_hour = models.TimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["author", "id"], name="library_author_id_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"{self.author} | {self.name} {self.address}"
 
@@ -43,6 +51,102 @@ class Genre(models.Model):
         return f"Genre: {self.name}"
 
 
+class ReturningQuerySet(models.QuerySet):
+    """
+    QuerySet with update_returning()
+    """
+
+    def update_returning(self, fields: list, **values) -> list:
+        """
+        update() that returns `fields` of the updated rows as dicts. A single UPDATE ... RETURNING statement
+        where the database supports it, so a conditional update needs no read before or after it
+        """
+        connection = connections[self.db]
+        # MySQL has no UPDATE ... RETURNING, MariaDB and Oracle spell it differently
+        if connection.vendor not in ("postgresql", "sqlite") or not connection.features.can_return_columns_from_insert:
+            with transaction.atomic(using=self.db):
+                pks = list(self.select_for_update().values_list("pk", flat=True))
+                self.model.objects.filter(pk__in=pks).update(**values)
+                return list(self.model.objects.filter(pk__in=pks).values(*fields))
+
+        query = self.query.chain(UpdateQuery)
+        query.add_update_values(values)
+        update_sql, params = query.get_compiler(self.db).as_sql()
+        columns = [self.model._meta.get_field(name).get_col(self.model._meta.db_table) for name in fields]
+        returning = ", ".join(connection.ops.quote_name(column.target.column) for column in columns)
+        converters = [connection.ops.get_db_converters(column) + column.get_db_converters(connection) for column in columns]
+
+        with transaction.mark_for_rollback_on_error(using=self.db), connection.cursor() as cursor:
+            cursor.execute(f"{update_sql} RETURNING {returning}", params)
+            rows = cursor.fetchall()
+        self._result_cache = None
+
+        results = []
+        for row in rows:
+            result = {}
+            for name, column, value, field_converters in zip(fields, columns, row, converters):
+                for converter in field_converters:
+                    value = converter(value, column, connection)
+                result[name] = value
+            results.append(result)
+        return results
+
+
+class BookQuerySet(ReturningQuerySet):
+    """
+    Keeps the denormalized comment_count and last_commented_at in sync with single UPDATE statements.
+    Every change of the comments of a book moves its modified_at
+    """
+
+    def add_comments(self, count: int, last_creation_date) -> int:
+        last_creation_date = Value(last_creation_date, output_field=models.DateTimeField())
+        return self.update(
+            comment_count=F("comment_count") + count,
+            last_commented_at=Greatest(Coalesce("last_commented_at", last_creation_date), last_creation_date),
+            modified_at=timezone.now(),
+        )
+
+    def remove_comments(self, count: int, returning: list = None):
+        """
+        Returns the number of updated books, or their `returning` fields as dicts (see update_returning)
+        """
+        values = {
+            "comment_count": Greatest(F("comment_count") - count, Value(0)),
+            "last_commented_at": self._last_comment_date(),
+            "modified_at": timezone.now(),
+        }
+        if returning:
+            return self.update_returning(returning, **values)
+        return self.update(**values)
+
+    def recount_comments(self) -> int:
+        counts = Comment.objects.filter(book=OuterRef("pk")).order_by().values("book").annotate(count=models.Count("id")).values("count")
+        return self.update(
+            comment_count=Coalesce(Subquery(counts), Value(0)),
+            last_commented_at=self._last_comment_date(),
+            modified_at=timezone.now(),
+        )
+
+    def refresh_last_commented(self, returning: list = None):
+        """
+        For a change of the creation_date of a comment. Returns like remove_comments()
+        """
+        values = {"last_commented_at": self._last_comment_date(), "modified_at": timezone.now()}
+        if returning:
+            return self.update_returning(returning, **values)
+        return self.update(**values)
+
+    def touch(self) -> int:
+        """
+        For changes of comments that don't change the counters
+        """
+        return self.update(modified_at=timezone.now())
+
+    @staticmethod
+    def _last_comment_date():
+        return Subquery(Comment.objects.filter(book=OuterRef("pk")).order_by("-creation_date").values("creation_date")[:1])
+
+
 class Book(models.Model):
     title = models.CharField(max_length=50)
     publication_date = models.DateTimeField(default=timezone.now)
@@ -50,15 +154,90 @@ class Book(models.Model):
     author = models.ForeignKey(AuthorUser, on_delete=CASCADE, related_name="books")
     genre = models.ForeignKey(Genre, on_delete=PROTECT, related_name="books")
 
+    # Denormalized from comments, see BookQuerySet and `manage.py repaircommentcounts`
+    comment_count = models.PositiveIntegerField(default=0)
+    last_commented_at = models.DateTimeField(null=True, default=None)
+    # Version of the book with its comments, used for ETag/Last-Modified of /api/books/<pk>/ and its comments
+    modified_at = models.DateTimeField(auto_now=True)
+
+    objects = BookQuerySet.as_manager()
+
+    class Meta:
+        # Matched to the queries of BookViewSet and GenreViewSet, see `manage.py explainqueries`
+        indexes = [
+            models.Index(fields=["publication_date", "id"], name="book_pub_date_idx"),
+            models.Index(fields=["genre", "publication_date", "id"], name="book_genre_pub_date_idx"),
+            models.Index(fields=["author", "id"], name="book_author_id_idx"),
+            models.Index(fields=["year"], name="book_year_idx"),
+            models.Index(fields=["title", "id"], name="book_title_id_idx"),
+        ]
+
     def __str__(self) -> str:
         return f"{self.title} | {self.author} | {self.genre}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        book = super().from_db(db, field_names, values)
+        # Genre of the row in the database, None if not loaded. Compared on save by signals.invalidate_previous_book_genre
+        book.saved_genre_id = book.__dict__.get("genre_id")
+        return book
+
+
+class CommentQuerySet(ReturningQuerySet):
+    def delete_rows(self) -> int:
+        """
+        A single DELETE returning the number of rows. Unlike delete() the rows are not loaded first,
+        so no post_delete is sent and related rows are not collected (comments have none)
+        """
+        return self._raw_delete(self.db)
+
 
 class Comment(models.Model):
     author = models.ForeignKey(AuthorUser, on_delete=CASCADE, related_name="comments")
     book = models.ForeignKey(Book, on_delete=CASCADE, related_name="comments")
     creation_date = models.DateTimeField(default=timezone.now)
     text = models.CharField(max_length=4000)
+    # Version of the comment, used for ETag/Last-Modified of /api/books/<pk>/comments/<pk>/
+    modified_at = models.DateTimeField(auto_now=True)
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["book", "creation_date", "id"], name="comment_book_date_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.author} | {self.book} | {self.text}"
+
+
+class SearchDocument(models.Model):
+    """
+    Book or comment in the pure-Python search index (book_review_app.search.PythonSearchBackend)
+    """
+
+    kind = models.CharField(max_length=16)
+    object_id = models.BigIntegerField()
+    length = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "object_id"], name="search_document_unique"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} {self.object_id}"
+
+
+class SearchPosting(models.Model):
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(SearchDocument, on_delete=CASCADE, related_name="postings")
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["term", "document"], name="search_posting_term_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.term} | {self.document} | {self.frequency}"
@@ -0,0 +1,48 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework import pagination
+
+
+class CursorPagination(pagination.CursorPagination):
+    """
+    Keyset pagination over an indexed column. Cost of a page doesn't depend on how deep it is
+    """
+
+    ordering = ("id",)
+    page_size_query_param = "page_size"
+
+    @property
+    def max_page_size(self) -> int:
+        return settings.PAGINATION_MAX_PAGE_SIZE
+
+    def get_nested_data(self, data: dict, key: str, results: list) -> OrderedDict:
+        """
+        Used when the paginated list is nested inside another object (e.g. comments of a book)
+        """
+        return OrderedDict(
+            [
+                *data.items(),
+                (key, results),
+                ("next", self.get_next_link()),
+                ("previous", self.get_previous_link()),
+            ]
+        )
+
+
+class BookCursorPagination(CursorPagination):
+    ordering = ("-publication_date", "-id")
+
+
+class CommentCursorPagination(CursorPagination):
+    ordering = ("-creation_date", "-id")
+
+
+class SearchPagination(pagination.LimitOffsetPagination):
+    """
+    Ranked hits have no key to paginate by, ?limit=&offset= is used instead
+    """
+
+    @property
+    def max_limit(self) -> int:
+        return settings.PAGINATION_MAX_PAGE_SIZE
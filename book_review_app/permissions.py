@@ -1,18 +1,43 @@
 from rest_framework import permissions
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.serializers import ValidationError
 
 
 class IsOwnProfileOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return obj == request.user
+        return obj.pk == request.user.pk
 
 
 class IsAuthorOrReadOnly(permissions.BasePermission):
+    """
+    Compares the author foreign key with the user, so the author row is never loaded
+    """
+
+    author_field = "author_id"
+
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return obj.author == request.user
+        return getattr(obj, self.author_field) == request.user.pk
+
+
+class IsAuthorFilterBackend(BaseFilterBackend):
+    """
+    Queryset counterpart of IsAuthorOrReadOnly for lists: ?mine=true leaves only the objects of the user
+    """
+
+    param = "mine"
+    author_field = "author_id"
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.param, "").lower()
+        if value in ("", "false", "0"):
+            return queryset
+        if value not in ("true", "1"):
+            raise ValidationError({self.param: ["Must be a valid boolean."]})
+        return queryset.filter(**{self.author_field: request.user.pk})
 
 
 class IsAdminOrReadOnly(permissions.BasePermission):
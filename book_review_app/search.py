@@ -0,0 +1,305 @@
+import html
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from django.db.models.functions import Cast
+from django.dispatch import receiver
+
+from book_review_app import models
+
+WORD_RE = re.compile(r"\w+")
+MAX_TERM_LENGTH = 64
+SNIPPET_WORDS = 12
+HIGHLIGHT = ("<mark>", "</mark>")
+# FTS5 snippet() wraps matches in these, turned into HIGHLIGHT after the text is escaped (see mark_up)
+MARKERS = ("\x02", "\x03")
+
+# kind -> (code used in FTS5 rowids, model, indexed field)
+KINDS = {
+    "book": (0, models.Book, "title"),
+    "comment": (1, models.Comment, "text"),
+}
+
+
+def tokenize(text: str) -> list:
+    return [word[:MAX_TERM_LENGTH] for word in WORD_RE.findall(text.lower())]
+
+
+def mark_up(snippet: str) -> str:
+    """
+    HTML-escaped snippet with MARKERS replaced by HIGHLIGHT
+    """
+    snippet = html.escape(snippet)
+    for marker, tag in zip(MARKERS, HIGHLIGHT):
+        snippet = snippet.replace(marker, tag)
+    return snippet
+
+
+def make_snippet(text: str, terms: set) -> str:
+    """
+    About SNIPPET_WORDS words of text around the first matched term, HTML-escaped, matched terms are highlighted
+    """
+    words = list(WORD_RE.finditer(text))
+    if not words:
+        return html.escape(text[:100])
+
+    hit = next((i for i, word in enumerate(words) if word.group().lower()[:MAX_TERM_LENGTH] in terms), 0)
+    start = max(0, min(hit - SNIPPET_WORDS // 2, len(words) - SNIPPET_WORDS))
+    end = min(len(words), start + SNIPPET_WORDS)
+
+    pieces = ["…" if start > 0 else ""]
+    position = words[start].start()
+    for word in words[start:end]:
+        pieces.append(html.escape(text[position : word.start()]))
+        if word.group().lower()[:MAX_TERM_LENGTH] in terms:
+            pieces.append(f"{HIGHLIGHT[0]}{html.escape(word.group())}{HIGHLIGHT[1]}")
+        else:
+            pieces.append(html.escape(word.group()))
+        position = word.end()
+    pieces.append("…" if end < len(words) else html.escape(text[position:]))
+    return "".join(pieces)
+
+
+class FTS5SearchBackend:
+    """
+    SQLite FTS5 virtual table. rowid encodes both kind and object id, so updates and deletes are rowid lookups
+    """
+
+    table = "book_review_app_search_fts"
+
+    @staticmethod
+    def is_available(conn) -> bool:
+        if conn.vendor != "sqlite":
+            return False
+        with conn.cursor() as cursor:
+            cursor.execute("PRAGMA compile_options")
+            return ("ENABLE_FTS5",) in cursor.fetchall()
+
+    def setup(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5(body, tokenize='unicode61 remove_diacritics 2')")
+
+    def rowid(self, kind: str, object_id: int) -> int:
+        return object_id * len(KINDS) + KINDS[kind][0]
+
+    def index_many(self, kind: str, items: list, created: bool = False):
+        with connection.cursor() as cursor:
+            if not created:
+                cursor.executemany(f"DELETE FROM {self.table} WHERE rowid = %s", [(self.rowid(kind, object_id),) for object_id, _ in items])
+            cursor.executemany(
+                f"INSERT INTO {self.table}(rowid, body) VALUES (%s, %s)", [(self.rowid(kind, object_id), text) for object_id, text in items]
+            )
+
+    def remove(self, kind: str, object_id: int):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [self.rowid(kind, object_id)])
+
+    def remove_queryset(self, kind: str, queryset):
+        rowids = queryset.annotate(fts_rowid=F("pk") * len(KINDS) + KINDS[kind][0]).values("fts_rowid")
+        sql, params = rowids.query.get_compiler(connection=connection).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({sql})", params)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    def where(self, terms: list, kinds: list):
+        # Every term is quoted, so the user can't inject FTS5 query syntax
+        sql = f"{self.table} MATCH %s"
+        params = [" ".join('"{}"'.format(term.replace('"', '""')) for term in terms)]
+        if kinds:
+            sql += f" AND (rowid - (rowid / {len(KINDS)}) * {len(KINDS)}) IN ({', '.join(['%s'] * len(kinds))})"
+            params += [KINDS[kind][0] for kind in kinds]
+        return sql, params
+
+    def count(self, terms: list, kinds: list) -> int:
+        where, params = self.where(terms, kinds)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {self.table} WHERE {where}", params)
+            return cursor.fetchone()[0]
+
+    def hits(self, terms: list, kinds: list, offset: int, limit: int) -> list:
+        where, params = self.where(terms, kinds)
+        codes = {code: kind for kind, (code, _, _) in KINDS.items()}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, -bm25({self.table}), snippet({self.table}, 0, %s, %s, '…', {SNIPPET_WORDS}) "
+                f"FROM {self.table} WHERE {where} ORDER BY bm25({self.table}), rowid LIMIT %s OFFSET %s",
+                [*MARKERS, *params, limit, offset],
+            )
+            return [(codes[rowid % len(KINDS)], rowid // len(KINDS), score, mark_up(snippet)) for rowid, score, snippet in cursor.fetchall()]
+
+
+class PythonSearchBackend:
+    """
+    Inverted index in SearchDocument/SearchPosting tables, works on any database. Ranked with BM25 without length normalization
+    """
+
+    def setup(self, conn):
+        pass
+
+    def index_many(self, kind: str, items: list, created: bool = False):
+        with transaction.atomic():
+            if not created:
+                models.SearchDocument.objects.filter(kind=kind, object_id__in=[object_id for object_id, _ in items]).delete()
+
+            terms = [Counter(tokenize(text)) for _, text in items]
+            documents = models.SearchDocument.objects.bulk_create(
+                [models.SearchDocument(kind=kind, object_id=object_id, length=sum(counter.values())) for (object_id, _), counter in zip(items, terms)]
+            )
+            if documents and documents[0].pk is None:
+                ids = dict(models.SearchDocument.objects.filter(kind=kind, object_id__in=[d.object_id for d in documents]).values_list("object_id", "id"))
+                for document in documents:
+                    document.pk = ids[document.object_id]
+
+            models.SearchPosting.objects.bulk_create(
+                [
+                    models.SearchPosting(term=term, document=document, frequency=frequency)
+                    for document, counter in zip(documents, terms)
+                    for term, frequency in counter.items()
+                ]
+            )
+
+    def remove(self, kind: str, object_id: int):
+        models.SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+    def remove_queryset(self, kind: str, queryset):
+        models.SearchDocument.objects.filter(kind=kind, object_id__in=queryset.values("pk")).delete()
+
+    def clear(self):
+        models.SearchPosting.objects.all().delete()
+        models.SearchDocument.objects.all().delete()
+
+    def matching(self, terms: list, kinds: list):
+        postings = models.SearchPosting.objects.filter(term__in=terms)
+        if kinds:
+            postings = postings.filter(document__kind__in=kinds)
+        return (
+            postings.values("document", "document__kind", "document__object_id")
+            .annotate(matched=Count("term", distinct=True))
+            .filter(matched=len(terms))
+        )
+
+    def count(self, terms: list, kinds: list) -> int:
+        return self.matching(terms, kinds).count()
+
+    def hits(self, terms: list, kinds: list, offset: int, limit: int) -> list:
+        total = models.SearchDocument.objects.count()
+        frequencies = dict(models.SearchPosting.objects.filter(term__in=terms).values_list("term").annotate(Count("id")))
+
+        frequency = Cast("frequency", FloatField())
+        weights = []
+        for term in terms:
+            found_in = frequencies.get(term, 0)
+            idf = math.log(1 + (total - found_in + 0.5) / (found_in + 0.5))
+            weights.append(When(term=term, then=frequency * Value(idf * 2.2) / (frequency + Value(1.2))))
+
+        rows = (
+            self.matching(terms, kinds)
+            .annotate(score=Sum(Case(*weights, default=Value(0.0), output_field=FloatField())))
+            .order_by("-score", "document")[offset : offset + limit]
+        )
+        return [(row["document__kind"], row["document__object_id"], row["score"], None) for row in rows]
+
+
+class SearchResults:
+    """
+    Lazy ranked hits. Supports count() and slicing, so LimitOffsetPagination can page through it
+    """
+
+    def __init__(self, backend, terms: list, kinds: list):
+        self.backend = backend
+        self.terms = terms
+        self.kinds = kinds
+
+    def count(self) -> int:
+        return self.backend.count(self.terms, self.kinds)
+
+    def __getitem__(self, item: slice) -> list:
+        hits = self.backend.hits(self.terms, self.kinds, item.start, item.stop - item.start)
+
+        # book ids of commented books, texts for snippets the backend didn't make
+        rows = {}
+        for kind, (_, model, field) in KINDS.items():
+            ids = [object_id for hit_kind, object_id, _, _ in hits if hit_kind == kind]
+            if ids:
+                book = "id" if kind == "book" else "book_id"
+                rows[kind] = {row[0]: row[1:] for row in model.objects.filter(id__in=ids).values_list("id", book, field)}
+
+        results = []
+        for kind, object_id, score, snippet in hits:
+            row = rows.get(kind, {}).get(object_id)
+            if row is None:  # deleted after it was matched
+                continue
+            book_id, text = row
+            results.append(
+                {
+                    "type": kind,
+                    "id": object_id,
+                    "book": book_id,
+                    "score": round(score, 6),
+                    "snippet": snippet if snippet is not None else make_snippet(text, set(self.terms)),
+                }
+            )
+        return results
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        name = settings.SEARCH_BACKEND
+        if name == "auto":
+            name = "fts5" if FTS5SearchBackend.is_available(connection) else "python"
+        _backend = {"fts5": FTS5SearchBackend, "python": PythonSearchBackend}[name]()
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    global _backend
+    if setting == "SEARCH_BACKEND":
+        _backend = None
+
+
+def kind_of(instance) -> str:
+    return kind_of_model(type(instance))
+
+
+def kind_of_model(model_class) -> str:
+    return next(kind for kind, (_, model, _) in KINDS.items() if issubclass(model_class, model))
+
+
+def index(instances: list, created: bool = False):
+    """
+    Adds or updates books or comments (all of the same model) in the search index.
+    created=True skips removing previous entries of the instances
+    """
+    if instances:
+        kind = kind_of(instances[0])
+        field = KINDS[kind][2]
+        get_backend().index_many(kind, [(instance.pk, getattr(instance, field)) for instance in instances], created=created)
+
+
+def remove(instance):
+    get_backend().remove(kind_of(instance), instance.pk)
+
+
+def remove_all(queryset):
+    """
+    Removes every book or comment of the queryset from the search index with a single statement, before they are deleted
+    """
+    get_backend().remove_queryset(kind_of_model(queryset.model), queryset)
+
+
+def search(query: str, kinds: list = None) -> SearchResults:
+    terms = list(dict.fromkeys(tokenize(query)))
+    return SearchResults(get_backend(), terms, kinds or [])
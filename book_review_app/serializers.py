@@ -1,9 +1,12 @@
 from datetime import date
 
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.serializers import ValidationError
 
 from book_review_app import models
+from book_review_app.cache import genre_index
+from book_review_app.signals import bulk_created
 
 
 class AuthorSerializer(serializers.ModelSerializer):
@@ -29,34 +32,96 @@ class AuthorSerializer(serializers.ModelSerializer):
         return user
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """
+    Creates all items with a single bulk_create inside one transaction
+    """
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        with transaction.atomic():
+            instances = model.objects.bulk_create([model(**attrs) for attrs in validated_data])
+        bulk_created.send(sender=model, instances=instances)
+        return instances
+
+
+class SparseFieldsMixin:
+    """
+    Takes an optional `fields` argument, only these of the declared fields are serialized
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class GenreSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Genre
         fields = ["id", "name"]
 
 
+class GenreNameField(serializers.RelatedField):
+    """
+    Accepts a genre by name or, as before names were accepted, by id. Represents it by id.
+    Names are resolved through the in-process genre index, a string of digits that is no genre name is taken for an id
+    """
+
+    default_error_messages = {
+        "does_not_exist": "{name} not found",
+        "does_not_exist_pk": 'Invalid pk "{pk_value}" - object does not exist.',
+        "incorrect_type": "Incorrect type. Expected genre name or id, received {data_type}.",
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (str, int)):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if isinstance(data, str):
+            genre_id = genre_index.get(data)
+            if genre_id is not None:
+                return models.Genre(id=genre_id, name=data)
+            if not data.isdigit():
+                self.fail("does_not_exist", name=data)
+
+        name = models.Genre.objects.filter(pk=int(data)).values_list("name", flat=True).first()
+        if name is None:
+            self.fail("does_not_exist_pk", pk_value=data)
+        return models.Genre(id=int(data), name=name)
+
+    def use_pk_only_optimization(self):
+        return True
+
+    def to_representation(self, value):
+        return value.pk
+
+
 class CommentSerializer(serializers.ModelSerializer):
-    author = serializers.SerializerMethodField()
+    author = serializers.ReadOnlyField(source="author_id")
 
     class Meta:
         model = models.Comment
         fields = ["id", "author", "book", "text", "creation_date"]
+        read_only_fields = ["book"]
+        list_serializer_class = BulkCreateListSerializer
 
     def create(self, validated_data):
         author = self.context["request"].user
         comment = models.Comment.objects.create(author=author, **validated_data)
         return comment
 
-    def get_author(self, obj):
-        return obj.author.id
-
 
-class BookSerializer(serializers.ModelSerializer):
-    comments = CommentSerializer(many=True, required=False)
+class BookSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    comments = CommentSerializer(many=True, read_only=True)
+    genre = GenreNameField(queryset=models.Genre.objects.all())
 
     class Meta:
         model = models.Book
         fields = ["id", "title", "year", "author", "genre", "publication_date", "comments"]
+        read_only_fields = ["author"]
+        list_serializer_class = BulkCreateListSerializer
 
     def validate_year(self, year):
         if year > 0 and year < date.today().year:
@@ -65,8 +130,18 @@ class BookSerializer(serializers.ModelSerializer):
             raise ValidationError("Incorrect year")
 
 
-class LibrarySerializer(serializers.ModelSerializer):
-    author = serializers.SerializerMethodField()
+class BookListSerializer(BookSerializer):
+    """
+    Book without nested comments, only their number and the date of the latest one
+    """
+
+    class Meta(BookSerializer.Meta):
+        fields = ["id", "title", "year", "author", "genre", "publication_date", "comment_count", "last_commented_at"]
+        read_only_fields = ["author", "comment_count", "last_commented_at"]
+
+
+class LibrarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author = serializers.ReadOnlyField(source="author_id")
 
     class Meta:
         model = models.Library
@@ -77,5 +152,11 @@ class LibrarySerializer(serializers.ModelSerializer):
         library = models.Library.objects.create(author=author, **validated_data)
         return library
 
-    def get_author(self, obj):
-        return obj.author.id
+
+class LibraryListSerializer(LibrarySerializer):
+    """
+    Library without coordinates and opening hours
+    """
+
+    class Meta(LibrarySerializer.Meta):
+        fields = ["id", "author", "name", "address"]
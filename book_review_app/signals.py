@@ -0,0 +1,155 @@
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from rest_framework.authtoken.models import Token
+
+from book_review_app import metrics, models, search
+from book_review_app.authentication import token_cache
+from book_review_app.cache import bump_generation_on_commit, genre_index
+
+# Sent by BulkCreateListSerializer with sender=<model> and instances=<created objects>,
+# bulk_create doesn't send post_save for every row
+bulk_created = Signal()
+
+
+def forget_tokens_on_commit(keys: list):
+    # After the commit, like the generation bumps: a write that is rolled back (or retried) keeps the cache as it was
+    def forget():
+        for key in keys:
+            token_cache().delete(key)
+
+    transaction.on_commit(forget)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    forget_tokens_on_commit([instance.key])
+
+
+@receiver(post_save, sender=models.AuthorUser)
+def forget_user_tokens(sender, instance, created, **kwargs):
+    # Cached tokens carry a copy of the user, so any change (e.g. is_active=False) must drop them
+    if created:
+        return
+    forget_tokens_on_commit(list(Token.objects.filter(user_id=instance.pk).values_list("key", flat=True)))
+
+
+@receiver(post_save, sender=models.Genre)
+@receiver(post_delete, sender=models.Genre)
+def invalidate_genre_responses(sender, instance, **kwargs):
+    bump_generation_on_commit("genres")
+    bump_generation_on_commit(f"genre:{instance.pk}")
+
+
+@receiver(post_save, sender=models.Genre)
+@receiver(post_delete, sender=models.Genre)
+def reload_genre_index(sender, **kwargs):
+    transaction.on_commit(genre_index.invalidate)
+
+
+@receiver(pre_save, sender=models.Book)
+def invalidate_previous_book_genre(sender, instance, update_fields=None, **kwargs):
+    # The book may be moving to another genre, the old genre page has to be rebuilt too
+    if instance.pk is None or (update_fields is not None and "genre" not in update_fields):
+        return
+    previous_genre_id = getattr(instance, "saved_genre_id", None)
+    if previous_genre_id is None:  # not read from the database (see Book.from_db)
+        previous_genre_id = models.Book.objects.filter(pk=instance.pk).values_list("genre_id", flat=True).first()
+    if previous_genre_id is not None and previous_genre_id != instance.genre_id:
+        bump_generation_on_commit(f"genre:{previous_genre_id}")
+
+
+@receiver(post_save, sender=models.Book)
+@receiver(post_delete, sender=models.Book)
+def invalidate_book_genre(sender, instance, **kwargs):
+    bump_generation_on_commit(f"genre:{instance.genre_id}")
+    instance.saved_genre_id = instance.genre_id
+
+
+@receiver(bulk_created, sender=models.Book)
+def invalidate_bulk_created_books_genres(sender, instances, **kwargs):
+    for genre_id in {book.genre_id for book in instances}:
+        bump_generation_on_commit(f"genre:{genre_id}")
+
+
+def comment_genre_ids(comments: list) -> set:
+    # The views save comments with their book, a query is only needed for comments saved without it
+    genre_ids = {comment.book.genre_id for comment in comments if models.Comment.book.is_cached(comment)}
+    book_ids = {comment.book_id for comment in comments if not models.Comment.book.is_cached(comment)}
+    if book_ids:
+        genre_ids.update(models.Book.objects.filter(pk__in=book_ids).values_list("genre_id", flat=True))
+    return genre_ids
+
+
+@receiver(post_save, sender=models.Comment)
+def invalidate_comment_book_genre(sender, instance, **kwargs):
+    # Genre pages show the comment counts of their books
+    for genre_id in comment_genre_ids([instance]):
+        bump_generation_on_commit(f"genre:{genre_id}")
+
+
+@receiver(bulk_created, sender=models.Comment)
+def invalidate_bulk_created_comments_genres(sender, instances, **kwargs):
+    for genre_id in comment_genre_ids(instances):
+        bump_generation_on_commit(f"genre:{genre_id}")
+
+
+# Comments have no delete receivers, so deleting a book or an author deletes their comments with a single DELETE
+# instead of loading them one by one. Whoever deletes comments keeps the search index and genre pages in sync:
+# the receivers below for cascades, BookViewSet.edit_or_remove_comment for a single comment
+@receiver(pre_delete, sender=models.Book)
+def remove_book_comments_from_search(sender, instance, **kwargs):
+    # The genre page is rebuilt by invalidate_book_genre
+    search.remove_all(models.Comment.objects.filter(book_id=instance.pk))
+
+
+@receiver(pre_delete, sender=models.AuthorUser)
+def remove_author_comments(sender, instance, **kwargs):
+    search.remove_all(models.Comment.objects.filter(author_id=instance.pk))
+    genre_ids = models.Book.objects.filter(comments__author_id=instance.pk).values_list("genre_id", flat=True).distinct()
+    for genre_id in genre_ids:
+        bump_generation_on_commit(f"genre:{genre_id}")
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def count_request_queries(sender, connection, **kwargs):
+    # Connections are per thread, so the wrapper goes on each one the thread opens instead of the middleware's.
+    # Sent again on reconnect of the same connection object
+    if metrics.count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.count_query)
+
+
+@receiver(post_migrate)
+def setup_search_index(sender, using, **kwargs):
+    if sender.name == "book_review_app" and search.FTS5SearchBackend.is_available(connections[using]):
+        search.FTS5SearchBackend().setup(connections[using])
+
+
+@receiver(post_save, sender=models.Book)
+@receiver(post_save, sender=models.Comment)
+def index_for_search(sender, instance, created, update_fields=None, **kwargs):
+    field = search.KINDS[search.kind_of(instance)][2]
+    if update_fields is None or field in update_fields:
+        search.index([instance], created=created)
+
+
+@receiver(bulk_created, sender=models.Book)
+@receiver(bulk_created, sender=models.Comment)
+def index_bulk_created_for_search(sender, instances, **kwargs):
+    search.index(instances, created=True)
+
+
+@receiver(post_delete, sender=models.Book)
+def remove_from_search(sender, instance, **kwargs):
+    search.remove(instance)
@@ -0,0 +1,75 @@
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+
+from book_review_app import models
+from book_review_app.authentication import token_cache
+from book_review_app.cache import genre_index
+
+
+def format_queries(context: CaptureQueriesContext) -> str:
+    return "\n".join(f"{i}. {query['sql']}" for i, query in enumerate(context.captured_queries, start=1))
+
+
+class QueryBudgetMixin:
+    """
+    Mixin for APITestCase. Asserts that an endpoint stays within a fixed number of queries,
+    and that the number does not grow with the data (see assertConstantQueries)
+    """
+
+    # Scales the dataset is seeded at, one after another
+    sizes = (1, 6)
+
+    def assertQueryBudget(self, client, path: str, budget: int, method: str = "get", **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(path=path, **kwargs)
+
+        self.assertLessEqual(
+            len(context), budget, f"{method.upper()} {path} executed {len(context)} queries, budget is {budget}:\n{format_queries(context)}"
+        )
+        return response
+
+    def seed(self, scale: int):
+        """
+        Adds `scale` authors, each with a library, `scale` books of self.genre commented `scale` times by self.author
+        and a comment on self.book. So the fan-out of every object (books of a genre and of an author, comments of a book)
+        grows with the scale, not only the number of rows
+        """
+        authors = baker.make(models.AuthorUser, _quantity=scale)
+        for author in authors:
+            baker.make(models.Library, author=author)
+            for book in baker.make(models.Book, author=author, genre=self.genre, _quantity=scale):
+                baker.make(models.Comment, author=self.author, book=book, _quantity=scale)
+            baker.make(models.Comment, author=author, book=self.book)
+        models.Book.objects.filter(Q(author__in=authors) | Q(pk=self.book.pk)).recount_comments()
+
+    def clear_caches(self):
+        for cache in caches.all():
+            cache.clear()
+        token_cache().clear()
+        genre_index.invalidate()
+
+    def assertConstantQueries(self, client, path, budget: int, method: str = "get", status: int = 200, **kwargs):
+        """
+        Seeds the dataset at every one of `sizes` and requests the endpoint after each, with cold caches.
+        `path` may be a callable taking the size and returning it, to target an object created after seeding (e.g. one to delete,
+        with a fan-out of that size).
+        Fails with the queries of every run if their number differs between the sizes or exceeds the budget
+        """
+        runs = []
+        for size in self.sizes:
+            self.seed(size)
+            self.clear_caches()
+            request_path = path(size) if callable(path) else path
+            with CaptureQueriesContext(connection) as context:
+                response = getattr(client, method)(path=request_path, **kwargs)
+            self.assertEqual(response.status_code, status, f"{method.upper()} {request_path}: {getattr(response, 'data', response)}")
+            runs.append((size, context))
+
+        counts = [len(context) for _, context in runs]
+        if len(set(counts)) > 1 or max(counts) > budget:
+            report = "\n".join(f"seeded at {size}, {len(context)} queries:\n{format_queries(context)}" for size, context in runs)
+            self.fail(f"{method.upper()} {path if isinstance(path, str) else request_path} executed {counts} queries, budget is {budget}:\n{report}")
+        return response
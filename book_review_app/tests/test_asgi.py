@@ -0,0 +1,41 @@
+import asyncio
+
+from django.test import AsyncClient
+from model_bakery import baker
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITransactionTestCase
+
+from book_review_app import models
+from book_review_app.tests.test_metrics import parse_server_timing
+
+
+# Under ASGI every request runs in its own thread, which only sees committed data
+class TestASGI(APITransactionTestCase):
+    def setUp(self) -> None:
+        self.user1 = baker.make(models.AuthorUser)
+        self.genre = baker.make(models.Genre)
+        self.book1 = baker.make(models.Book, author=self.user1, genre=self.genre)
+        baker.make(models.Comment, author=self.user1, book=self.book1, _quantity=3)
+
+        self.token = Token.objects.create(user=self.user1)
+
+    async def test_concurrent_requests(self):
+        client = AsyncClient()
+        paths = ["/api/books/", f"/api/books/{self.book1.id}/", f"/api/books/{self.book1.id}/comments/", f"/api/genres/{self.genre.id}/"]
+
+        # Extra arguments of AsyncClient requests are sent as headers
+        responses = await asyncio.gather(*(client.get(path, authorization=f"Token {self.token.key}") for path in paths * 3))
+
+        self.assertEqual([response.status_code for response in responses], [200] * len(paths) * 3)
+
+    async def test_unauth(self):
+        response = await AsyncClient().get("/api/books/")
+
+        self.assertEqual(response.status_code, 401)
+
+    async def test_server_timing(self):
+        response = await AsyncClient().get(f"/api/books/{self.book1.id}/", authorization=f"Token {self.token.key}")
+
+        self.assertEqual(response.status_code, 200)
+        # The request runs in a thread of its own, its queries are counted there
+        self.assertEqual(parse_server_timing(response["Server-Timing"])["db"]["desc"], '"3 queries"')
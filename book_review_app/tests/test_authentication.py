@@ -0,0 +1,71 @@
+from django.core.cache import caches
+from model_bakery import baker
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from book_review_app import models
+from book_review_app.cache import DjangoCache
+
+
+class TestCachedTokenAuthentication(APITestCase):
+    def setUp(self) -> None:
+        self.user = baker.make(models.AuthorUser)
+        self.token = Token.objects.create(user=self.user)
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_token_is_resolved_once(self):
+        path = f"/api/authors/{self.user.id}/"
+
+        with self.assertNumQueries(2):
+            response = self.client.get(path=path)
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(path=path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["id"], self.user.id)
+
+    def test_wrong_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Token wrong")
+        response = self.client.get(path="/api/authors/")
+
+        self.assertEqual(response.status_code, 401)
+        self.assertJSONEqual(response.content, {"detail": "Invalid token."})
+
+    def test_logout_invalidates_cached_token(self):
+        self.client.get(path="/api/authors/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(path="/api/v1/api-token-deauth/")
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(path="/api/authors/")
+        self.assertEqual(response.status_code, 401)
+
+    def test_deactivation_invalidates_cached_token(self):
+        self.client.get(path="/api/authors/")
+
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        response = self.client.get(path="/api/authors/")
+        self.assertEqual(response.status_code, 401)
+        self.assertJSONEqual(response.content, {"detail": "User inactive or deleted."})
+
+
+class TestDjangoCache(APITestCase):
+    def test_clear_keeps_other_entries_of_the_alias(self):
+        token_cache = DjangoCache(key_prefix="token:")
+        token_cache.set("key", "user")
+        caches["default"].set("other", "value")
+
+        token_cache.clear()
+
+        self.assertIsNone(token_cache.get("key"))
+        self.assertEqual(caches["default"].get("other"), "value")
+
+        token_cache.set("key", "user")
+        self.assertEqual(token_cache.get("key"), "user")
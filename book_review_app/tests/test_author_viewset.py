@@ -18,7 +18,7 @@ class TestAuthorView(APITestCase):
 
     def test_get_authors_auth(self):
         response = self.user1_client.get(path="/api/authors/")
-        res_json = response.json()[0]
+        res_json = response.json()["results"][0]
 
         self.assertEqual(response.status_code, 200)
         self.assertIn("id", res_json)
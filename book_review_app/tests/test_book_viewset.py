@@ -1,4 +1,7 @@
+import json
 import random
+from datetime import datetime, timezone
+
 from model_bakery import baker
 from rest_framework.test import APIClient, APITestCase
 
@@ -26,7 +29,7 @@ class TestBookView(APITestCase):
 
     def test_get_books_auth(self):
         response = self.user1_client.get(path="/api/books/")
-        res_json = response.json()[0]
+        res_json = response.json()["results"][0]
 
         self.assertEqual(response.status_code, 200)
         self.assertIn("title", res_json)
@@ -34,7 +37,145 @@ class TestBookView(APITestCase):
         self.assertIn("author", res_json)
         self.assertIn("genre", res_json)
         self.assertIn("publication_date", res_json)
-        self.assertIn("comments", res_json)
+        self.assertIn("comment_count", res_json)
+        self.assertIn("last_commented_at", res_json)
+        self.assertNotIn("comments", res_json)
+
+    def test_get_books_sparse_fields(self):
+        baker.make(models.Book, author=self.user1, genre=self.genres[0], _quantity=3)
+
+        with self.assertNumQueries(1):
+            response = self.user1_client.get(path="/api/books/", data={"fields": "id,genre", "page_size": 2})
+        res_json = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(res_json["results"][0]), {"id", "genre"})
+
+        with self.assertNumQueries(1):
+            res_json = self.user1_client.get(res_json["next"]).json()
+        self.assertEqual(len(res_json["results"]), 2)
+
+    def test_get_books_sparse_fields_unknown(self):
+        response = self.user1_client.get(path="/api/books/", data={"fields": "id,comments"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("fields", response.json())
+
+    def test_retrieve_book_sparse_fields(self):
+        baker.make(models.Comment, author=self.user2, book=self.book1)
+
+        with self.assertNumQueries(1):
+            response = self.user1_client.get(path=f"/api/books/{self.book1.id}/", data={"fields": "title"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {"title": self.book1.title})
+
+    def test_get_books_paginated(self):
+        baker.make(models.Book, author=self.user1, genre=self.genres[0], _quantity=3)
+
+        response = self.user1_client.get(path="/api/books/", data={"page_size": 2})
+        res_json = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(res_json["results"]), 2)
+        self.assertIsNone(res_json["previous"])
+
+        seen = [book["id"] for book in res_json["results"]]
+        while res_json["next"]:
+            res_json = self.user1_client.get(res_json["next"]).json()
+            seen += [book["id"] for book in res_json["results"]]
+
+        self.assertCountEqual(seen, models.Book.objects.values_list("id", flat=True))
+
+    def test_get_books_page_size_is_capped(self):
+        with self.settings(PAGINATION_MAX_PAGE_SIZE=1):
+            response = self.user1_client.get(path="/api/books/", data={"page_size": 100})
+
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def get_book_ids(self, **params):
+        response = self.user1_client.get(path="/api/books/", data=params)
+        self.assertEqual(response.status_code, 200)
+        return [book["id"] for book in response.json()["results"]]
+
+    def test_filter_books(self):
+        models.Book.objects.filter(id=self.book1.id).update(year=1900, title="Война и мир", genre=self.genres[0])
+        models.Book.objects.filter(id=self.book2.id).update(year=2000, title="Воскресение", genre=self.genres[1])
+
+        self.assertEqual(self.get_book_ids(genre=self.genres[0].id), [self.book1.id])
+        self.assertEqual(self.get_book_ids(author=self.user2.id), [self.book2.id])
+        self.assertEqual(self.get_book_ids(year_min=1950), [self.book2.id])
+        self.assertEqual(self.get_book_ids(year_max=1950), [self.book1.id])
+        self.assertEqual(self.get_book_ids(search="Вой"), [self.book1.id])
+        self.assertCountEqual(self.get_book_ids(search="Во"), [self.book1.id, self.book2.id])
+        self.assertEqual(self.get_book_ids(search="мир"), [])
+
+    def test_filter_books_by_publication_date(self):
+        self.book1.publication_date = datetime(1999, 1, 1, tzinfo=timezone.utc)
+        self.book1.save()
+
+        self.assertEqual(self.get_book_ids(published_before="2000-01-01T00:00:00Z"), [self.book1.id])
+        self.assertEqual(self.get_book_ids(published_after="2000-01-01T00:00:00Z"), [self.book2.id])
+
+    def test_filter_books_wrong_value(self):
+        response = self.user1_client.get(path="/api/books/", data={"year_min": "nineteen"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, {"year_min": ["A valid integer is required."]})
+
+    def test_order_books(self):
+        models.Book.objects.filter(id=self.book1.id).update(title="Б")
+        models.Book.objects.filter(id=self.book2.id).update(title="А")
+
+        self.assertEqual(self.get_book_ids(ordering="title"), [self.book2.id, self.book1.id])
+        self.assertEqual(self.get_book_ids(ordering="-title"), [self.book1.id, self.book2.id])
+        self.assertEqual(self.get_book_ids(ordering="title", page_size=1), [self.book2.id])
+
+    def test_order_books_by_several_or_low_cardinality_fields(self):
+        models.Book.objects.filter(id=self.book1.id).update(title="Б", year=1900, publication_date=datetime(2000, 1, 1, tzinfo=timezone.utc))
+        models.Book.objects.filter(id=self.book2.id).update(title="А", year=2000, publication_date=datetime(1900, 1, 1, tzinfo=timezone.utc))
+
+        # Cursor pagination would page through them with OFFSET, the default ordering (-publication_date) is used
+        self.assertEqual(self.get_book_ids(ordering="title,-year"), [self.book1.id, self.book2.id])
+        self.assertEqual(self.get_book_ids(ordering="year"), [self.book1.id, self.book2.id])
+
+    def test_order_books_by_not_indexed_field(self):
+        models.Book.objects.filter(id=self.book1.id).update(publication_date=datetime(2000, 1, 1, tzinfo=timezone.utc))
+        models.Book.objects.filter(id=self.book2.id).update(publication_date=datetime(1900, 1, 1, tzinfo=timezone.utc))
+
+        # Not whitelisted, the default ordering (-publication_date) is used
+        self.assertEqual(self.get_book_ids(ordering="author__name"), [self.book1.id, self.book2.id])
+        self.assertEqual(self.get_book_ids(ordering="-author__name"), [self.book1.id, self.book2.id])
+
+    def test_export_books(self):
+        baker.make(models.Comment, author=self.user2, book=self.book1, _quantity=2)
+
+        with self.settings(EXPORT_CHUNK_SIZE=1):
+            response = self.user1_client.get(path="/api/books/export/")
+            lines = b"".join(response.streaming_content).splitlines()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+
+        books = {book["id"]: book for book in map(json.loads, lines)}
+        self.assertCountEqual(books, [self.book1.id, self.book2.id])
+        self.assertEqual(len(books[self.book1.id]["comments"]), 2)
+        self.assertEqual(books[self.book2.id]["comments"], [])
+
+    def test_export_books_filtered(self):
+        models.Book.objects.filter(id=self.book1.id).update(year=1900)
+        models.Book.objects.filter(id=self.book2.id).update(year=2000)
+
+        response = self.user1_client.get(path="/api/books/export/", data={"year": 1900})
+        lines = b"".join(response.streaming_content).splitlines()
+
+        self.assertEqual([json.loads(line)["id"] for line in lines], [self.book1.id])
+
+    def test_export_books_wrong_filter(self):
+        response = self.user1_client.get(path="/api/books/export/", data={"published_after": "yesterday"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, {"published_after": ["A valid datetime is required."]})
 
     def test_retrieve_book_auth(self):
         response = self.user1_client.get(path=f"/api/books/{self.book1.id}/")
@@ -51,6 +192,29 @@ class TestBookView(APITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertJSONEqual(response.content, expected_json)
 
+    def test_retrieve_book_not_modified(self):
+        path = f"/api/books/{self.book1.id}/"
+        etag = self.user1_client.get(path=path)["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.user1_client.get(path=path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        self.user1_client.patch(path=path, data={"title": "Новое название"}, format="json")
+
+        response = self.user1_client.get(path=path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["title"], "Новое название")
+
+    def test_retrieve_book_sparse_fields_not_modified(self):
+        path = f"/api/books/{self.book1.id}/?fields=title"
+        etag = self.user1_client.get(path=path)["ETag"]
+
+        with self.assertNumQueries(1):
+            response = self.user1_client.get(path=path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
     def test_retrieve_book_library_auth(self):
         response = self.user1_client.get(path=f"/api/books/{self.book2.id}/")
         expected_json = {
@@ -98,6 +262,121 @@ class TestBookView(APITestCase):
         self.assertEqual(response.status_code, 201)
         self.assertJSONEqual(response.content, expected_json)
 
+    def test_create_book_auth_genre_index(self):
+        self.user1_client.post(path="/api/books/", data=self.book_data, format="json")
+
+        # INSERT and search index INSERT in a savepoint (WriteRetryMixin). Genre name is resolved from the loaded index,
+        # a new book has no comments to query
+        with self.assertNumQueries(4):
+            response = self.user1_client.post(path="/api/books/", data=self.book_data, format="json")
+
+        self.assertEqual(response.status_code, 201)
+
+    def test_create_book_auth_new_genre(self):
+        self.user1_client.post(path="/api/books/", data=self.book_data, format="json")
+        genre = models.Genre.objects.create(name="Poetry")
+
+        data = {**self.book_data, "genre": "Poetry"}
+        response = self.user1_client.post(path="/api/books/", data=data, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["genre"], genre.id)
+
+    def test_create_book_auth_wrong_genre(self):
+        data = {**self.book_data, "genre": "Poetry"}
+        response = self.user1_client.post(path="/api/books/", data=data, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, {"genre": ["Poetry not found"]})
+
+    def test_update_book_genre_by_name_or_id(self):
+        path = f"/api/books/{self.book1.id}/"
+        for genre, data in [(self.genres[0], self.genres[0].name), (self.genres[1], self.genres[1].id), (self.genres[2], str(self.genres[2].id))]:
+            with self.subTest(genre=data):
+                response = self.user1_client.patch(path=path, data={"genre": data}, format="json")
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["genre"], genre.id)
+                self.assertEqual(models.Book.objects.get(id=self.book1.id).genre_id, genre.id)
+
+        response = self.user1_client.put(path=path, data={**self.book_data, "genre": self.genres[3].id}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["genre"], self.genres[3].id)
+
+    def test_update_book_wrong_genre(self):
+        path = f"/api/books/{self.book1.id}/"
+        missing = max(genre.id for genre in self.genres) + 1
+        for data, error in [(missing, f'Invalid pk "{missing}" - object does not exist.'), (True, "Incorrect type. Expected genre name or id, received bool.")]:
+            with self.subTest(genre=data):
+                response = self.user1_client.patch(path=path, data={"genre": data}, format="json")
+
+                self.assertEqual(response.status_code, 400)
+                self.assertJSONEqual(response.content, {"genre": [error]})
+
+    def test_create_book_auth_without_genre(self):
+        data = {"title": "Вам и не снилось", "year": 1984}
+        response = self.user1_client.post(path="/api/books/", data=data, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, {"genre": ["This field is required."]})
+
+    def test_create_book_auth_form_data(self):
+        response = self.user1_client.post(path="/api/books/", data=self.book_data)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["author"], self.user1.id)
+
+    def test_bulk_create_books_auth(self):
+        genre = self.genres[0]
+        data = [{**self.book_data, "title": f"Том {i}", "genre": genre.name} for i in range(3)]
+        self.user1_client.get(path=f"/api/genres/{genre.id}/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.user1_client.post(path="/api/books/bulk/", data=data, format="json")
+        res_json = response.json()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([book["title"] for book in res_json], ["Том 0", "Том 1", "Том 2"])
+        self.assertTrue(all(book["author"] == self.user1.id for book in res_json))
+        self.assertEqual(models.Book.objects.filter(id__in=[book["id"] for book in res_json]).count(), 3)
+
+        response = self.user1_client.get(path=f"/api/genres/{genre.id}/")
+        self.assertEqual(len(response.json()["books_by_genre"]), models.Book.objects.filter(genre=genre).count())
+
+    def test_bulk_create_books_auth_single_insert(self):
+        data = [self.book_data] * 10
+        self.user1_client.post(path="/api/books/bulk/", data=data[:1], format="json")
+
+        # INSERT (inside a savepoint) and search index INSERT in a savepoint (WriteRetryMixin), new books have no comments to query
+        with self.assertNumQueries(6):
+            response = self.user1_client.post(path="/api/books/bulk/", data=data, format="json")
+
+        self.assertEqual(response.status_code, 201)
+
+    def test_bulk_create_books_auth_ignores_comments(self):
+        data = [{**self.book_data, "comments": [{"text": "Text"}]}]
+        response = self.user1_client.post(path="/api/books/bulk/", data=data, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()[0]["comments"], [])
+        self.assertFalse(models.Comment.objects.filter(book_id=response.json()[0]["id"]).exists())
+
+    def test_bulk_create_books_auth_invalid_item(self):
+        books_count = models.Book.objects.count()
+        data = [self.book_data, {**self.book_data, "year": -1}]
+        response = self.user1_client.post(path="/api/books/bulk/", data=data, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, [{}, {"year": ["Incorrect year"]}])
+        self.assertEqual(models.Book.objects.count(), books_count)
+
+    def test_bulk_create_books_auth_too_many(self):
+        with self.settings(BULK_CREATE_MAX_BATCH_SIZE=1):
+            response = self.user1_client.post(path="/api/books/bulk/", data=[self.book_data] * 2, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, {"non_field_errors": ["Ensure this field has no more than 1 elements."]})
+
     def test_create_book_auth_wrong_year(self):
         expected_json = {"year": ["Incorrect year"]}
         data = {"title": "Вам и не снилось", "year": -1, "genre": random.choice([i.name for i in self.genres])}
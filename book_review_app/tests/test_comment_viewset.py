@@ -1,4 +1,11 @@
+import math
 import random
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+from django.utils.http import http_date
 from model_bakery import baker
 from rest_framework.test import APIClient, APITestCase
 
@@ -39,6 +46,63 @@ class TestCommentsView(APITestCase):
         self.assertIn("text", res_json[0])
         self.assertIn("creation_date", res_json[0])
 
+    def test_get_comments_paginated(self):
+        response = self.user1_client.get(path=f"/api/books/{self.book1.id}/comments/", data={"page_size": 1})
+        res_json = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(res_json["id"], self.book1.id)
+        self.assertEqual(len(res_json["comments"]), 1)
+        self.assertIsNotNone(res_json["next"])
+
+        next_json = self.user1_client.get(res_json["next"]).json()
+        self.assertEqual(len(next_json["comments"]), 1)
+        self.assertNotEqual(res_json["comments"][0]["id"], next_json["comments"][0]["id"])
+        self.assertIsNone(next_json["next"])
+
+    def test_get_comments_not_modified(self):
+        path = f"/api/books/{self.book1.id}/comments/"
+        models.Book.objects.filter(pk=self.book1.pk).update(modified_at=timezone.now() - timedelta(seconds=10))
+        response = self.user1_client.get(path=path)
+
+        self.assertTrue(response["ETag"].startswith("W/"))
+        with self.assertNumQueries(1):
+            not_modified = self.user1_client.get(path=path, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified["ETag"], response["ETag"])
+
+        not_modified = self.user1_client.get(path=path, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(not_modified.status_code, 304)
+
+        other_page = self.user1_client.get(path=path, data={"page_size": 1})
+        self.assertNotEqual(other_page["ETag"], response["ETag"])
+
+    def test_get_comments_modified_within_a_second(self):
+        path = f"/api/books/{self.book1.id}/comments/"
+        # The second of the last change isn't over, another change may still come within it
+        modified_at = (timezone.now() + timedelta(seconds=1)).replace(microsecond=500000)
+        models.Book.objects.filter(pk=self.book1.pk).update(modified_at=modified_at)
+
+        response = self.user1_client.get(path=path, HTTP_IF_MODIFIED_SINCE=http_date(math.ceil(modified_at.timestamp())))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Last-Modified", response)
+
+    def test_comment_changes_modify_book(self):
+        path = f"/api/books/{self.book1.id}/comments/"
+        changes = [
+            lambda: self.user2_client.post(path=path, data=self.comment_data, format="json"),
+            lambda: self.user2_client.post(path=f"{path}bulk/", data=[self.comment_data], format="json"),
+            lambda: self.user1_client.patch(path=f"{path}{self.comment1.id}/", data={"text": "Передумал"}, format="json"),
+            lambda: self.user2_client.delete(path=f"{path}{self.comment2.id}/"),
+        ]
+        for change in changes:
+            etag = self.user1_client.get(path=path)["ETag"]
+            self.assertLess(change().status_code, 300)
+
+            response = self.user1_client.get(path=path, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etag)
+
     def test_retrieve_comment_auth(self):
         response = self.user1_client.get(path=f"/api/books/{self.book1.id}/comments/1/")
 
@@ -83,6 +147,85 @@ class TestCommentsView(APITestCase):
         self.assertEqual(response.status_code, 201)
         self.assertJSONEqual(response.content, expected_json)
 
+    def test_comment_counters(self):
+        models.Book.objects.filter(id=self.book1.id).recount_comments()
+
+        response = self.user2_client.post(path=f"/api/books/{self.book1.id}/comments/", data=self.comment_data, format="json")
+        self.book1.refresh_from_db()
+
+        self.assertEqual(self.book1.comment_count, 3)
+        self.assertEqual(self.book1.last_commented_at, models.Comment.objects.get(id=response.json()["id"]).creation_date)
+
+        self.user2_client.post(path=f"/api/books/{self.book1.id}/comments/bulk/", data=[self.comment_data] * 2, format="json")
+        self.book1.refresh_from_db()
+
+        self.assertEqual(self.book1.comment_count, 5)
+        self.assertEqual(self.book1.last_commented_at, self.book1.comments.latest("creation_date").creation_date)
+
+        self.user1_client.delete(path=f"/api/books/{self.book1.id}/comments/{self.comment1.id}/")
+        self.book1.refresh_from_db()
+
+        self.assertEqual(self.book1.comment_count, 4)
+
+        response = self.user1_client.get(path="/api/books/")
+        book = next(book for book in response.json()["results"] if book["id"] == self.book1.id)
+        self.assertEqual(book["comment_count"], 4)
+
+    def test_comment_creation_date_edit(self):
+        models.Book.objects.filter(id=self.book1.id).recount_comments()
+        later = timezone.now() + timedelta(days=30)
+
+        response = self.user1_client.patch(
+            path=f"/api/books/{self.book1.id}/comments/{self.comment1.id}/", data={"creation_date": later.isoformat()}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.book1.refresh_from_db()
+        self.assertEqual(self.book1.last_commented_at, later)
+
+        response = self.user1_client.patch(
+            path=f"/api/books/{self.book1.id}/comments/{self.comment1.id}/", data={"creation_date": "2000-01-01T00:00:00Z"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.book1.refresh_from_db()
+        self.assertEqual(self.book1.last_commented_at, self.comment2.creation_date)
+
+    def test_comment_counters_repair(self):
+        models.Book.objects.update(comment_count=10)
+
+        call_command("repaircommentcounts", batch_size=1, stdout=StringIO())
+
+        self.assertEqual(dict(models.Book.objects.values_list("id", "comment_count")), {self.book1.id: 2, self.book2.id: 0})
+        self.assertIsNone(models.Book.objects.get(id=self.book2.id).last_commented_at)
+        self.assertEqual(models.Book.objects.get(id=self.book1.id).last_commented_at, max(self.comment1.creation_date, self.comment2.creation_date))
+
+    def test_create_comment_auth_missing_book(self):
+        response = self.user1_client.post(path="/api/books/1000/comments/", data=self.comment_data, format="json")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_create_comments_auth(self):
+        data = [{"text": f"Комментарий {i}"} for i in range(3)]
+        response = self.user2_client.post(path=f"/api/books/{self.book1.id}/comments/bulk/", data=data, format="json")
+        res_json = response.json()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([comment["text"] for comment in res_json], [item["text"] for item in data])
+        self.assertTrue(all(comment["author"] == self.user2.id and comment["book"] == self.book1.id for comment in res_json))
+        self.assertEqual(self.book1.comments.count(), 5)
+
+    def test_bulk_create_comments_auth_invalid_item(self):
+        data = [self.comment_data, {"text": ""}]
+        response = self.user2_client.post(path=f"/api/books/{self.book1.id}/comments/bulk/", data=data, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, [{}, {"text": ["This field may not be blank."]}])
+        self.assertEqual(self.book1.comments.count(), 2)
+
+    def test_bulk_create_comments_unauth(self):
+        response = self.anon.post(path=f"/api/books/{self.book1.id}/comments/bulk/", data=[self.comment_data], format="json")
+
+        self.assertEqual(response.status_code, 401)
+
     def test_user_tries_patch_his_comment_data(self):
         patch_data = {"text": "Передумал! Отврасхитительно"}
         response = self.user1_client.patch(path=f"/api/books/{self.book1.id}/comments/{self.comment1.id}/", data=patch_data, format="json")
@@ -117,3 +260,39 @@ class TestCommentsView(APITestCase):
 
         self.assertEqual(response.status_code, 403)
         self.assertJSONEqual(response.content, expected_json)
+
+    def test_user_tries_patch_invalid_comment_data(self):
+        response = self.user1_client.patch(path=f"/api/books/{self.book1.id}/comments/{self.comment1.id}/", data={"text": ""}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(models.Comment.objects.get(id=self.comment1.id).text, self.comment1.text)
+
+    def test_patch_and_delete_missing_comment(self):
+        missing = [
+            f"/api/books/{self.book1.id}/comments/{self.comment1.id + 100}/",
+            f"/api/books/{self.book2.id}/comments/{self.comment1.id}/",  # belongs to another book
+        ]
+        for path in missing:
+            with self.subTest(path=path):
+                self.assertEqual(self.user1_client.patch(path=path, data=self.comment_data, format="json").status_code, 404)
+                self.assertEqual(self.user1_client.delete(path=path).status_code, 404)
+                self.assertEqual(self.user1_client.get(path=path).status_code, 404)
+
+        self.assertEqual(models.Comment.objects.count(), 2)
+        self.assertEqual(models.Comment.objects.get(id=self.comment1.id).text, self.comment1.text)
+
+    def test_comment_edits_update_search_and_versions(self):
+        path = f"/api/books/{self.book1.id}/comments/{self.comment1.id}/"
+        etag = self.user1_client.get(path=path)["ETag"]
+        self.assertEqual(self.user1_client.get(path=path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        response = self.user1_client.patch(path=path, data={"text": "Передумал"}, format="json")
+        self.assertEqual(response.json()["creation_date"], self.comment1.creation_date.strftime("%Y-%m-%dT%H:%M:%S.%fZ"))
+        self.assertGreater(models.Comment.objects.get(id=self.comment1.id).modified_at, self.comment1.modified_at)
+        self.assertEqual(self.user1_client.get(path=path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        hits = self.user1_client.get(path="/api/search/", data={"q": "передумал"}).json()["results"]
+        self.assertEqual([(hit["type"], hit["id"]) for hit in hits], [("comment", self.comment1.id)])
+
+        self.user1_client.delete(path=path)
+        self.assertEqual(self.user1_client.get(path="/api/search/", data={"q": "передумал"}).json()["results"], [])
@@ -0,0 +1,91 @@
+from django.test import override_settings
+from django.utils import timezone
+from model_bakery import baker
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+
+from book_review_app import models, serializers
+from book_review_app.cache import response_cache
+from book_review_app.compiled import compile_serializer
+
+
+class TestCompiledSerializers(APITestCase):
+    def setUp(self) -> None:
+        self.user1 = baker.make(models.AuthorUser)
+        self.user2 = baker.make(models.AuthorUser)
+        self.genre = baker.make(models.Genre)
+
+        self.book1 = baker.make(models.Book, author=self.user1, genre=self.genre)
+        self.book2 = baker.make(models.Book, author=self.user2, genre=self.genre)
+        baker.make(models.Comment, author=self.user2, book=self.book1, _quantity=3)
+        models.Book.objects.recount_comments()
+
+        baker.make(models.Library, author=self.user1, latitude="0.7522200000000000", longitude="-0.6155600000000000")
+        baker.make(models.Library, author=self.user2)
+
+        self.user1_client = APIClient()
+        self.user1_client.force_authenticate(user=self.user1)
+
+    def assertParity(self, serializer_class, queryset, fields=None, prefetch=()):
+        compiled = compile_serializer(serializer_class, fields)
+        expected = serializer_class(queryset.prefetch_related(*prefetch), many=True, **({"fields": fields} if fields else {})).data
+
+        self.assertEqual(JSONRenderer().render(compiled.represent(compiled.values(queryset))), JSONRenderer().render(expected))
+
+    def test_book_parity(self):
+        self.assertParity(serializers.BookSerializer, models.Book.objects.order_by("id"), prefetch=["comments"])
+
+    def test_book_list_parity(self):
+        self.assertParity(serializers.BookListSerializer, models.Book.objects.order_by("id"))
+
+    def test_sparse_fields_parity(self):
+        self.assertParity(serializers.BookListSerializer, models.Book.objects.order_by("id"), fields=["title", "last_commented_at"])
+
+    def test_comment_parity(self):
+        self.assertParity(serializers.CommentSerializer, models.Comment.objects.order_by("id"))
+
+    def test_genre_parity(self):
+        self.assertParity(serializers.GenreSerializer, models.Genre.objects.order_by("id"))
+
+    def test_library_parity(self):
+        self.assertParity(serializers.LibrarySerializer, models.Library.objects.order_by("id"))
+        self.assertParity(serializers.LibraryListSerializer, models.Library.objects.order_by("id"))
+
+    def test_parity_in_other_timezone(self):
+        with timezone.override("Asia/Yekaterinburg"):
+            self.assertParity(serializers.BookSerializer, models.Book.objects.order_by("id"), prefetch=["comments"])
+
+    def test_endpoints_parity(self):
+        paths = [
+            "/api/books/?page_size=1",
+            "/api/books/?fields=id,comment_count",
+            "/api/books/?ordering=title",
+            f"/api/books/{self.book1.id}/comments/",
+            f"/api/genres/{self.genre.id}/?fields=title",
+            "/api/genres/",
+            "/api/libraries/",
+            "/api/books/export/",
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                response = self.user1_client.get(path)
+                response_cache().clear()  # genres are served from the cache otherwise
+                with override_settings(COMPILED_SERIALIZERS=True):
+                    compiled = self.user1_client.get(path)
+
+                self.assertEqual(compiled.status_code, 200)
+                content = b"".join(compiled.streaming_content) if compiled.streaming else compiled.content
+                expected = b"".join(response.streaming_content) if response.streaming else response.content
+                self.assertEqual(content, expected)
+
+    @override_settings(COMPILED_SERIALIZERS=True)
+    def test_compiled_pages(self):
+        baker.make(models.Book, author=self.user1, genre=self.genre, _quantity=3)
+
+        res_json = self.user1_client.get(path="/api/books/", data={"page_size": 2, "fields": "id"}).json()
+        seen = [book["id"] for book in res_json["results"]]
+        while res_json["next"]:
+            res_json = self.user1_client.get(res_json["next"]).json()
+            seen += [book["id"] for book in res_json["results"]]
+
+        self.assertCountEqual(seen, models.Book.objects.values_list("id", flat=True))
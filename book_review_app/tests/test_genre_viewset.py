@@ -0,0 +1,149 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from rest_framework.test import APIClient, APITestCase
+
+from book_review_app import models
+
+
+class TestGenreView(APITestCase):
+    def setUp(self) -> None:
+        self.user1 = baker.make(models.AuthorUser)
+        self.admin = baker.make(models.AuthorUser, is_staff=True)
+
+        self.genre1 = baker.make(models.Genre)
+        self.genre2 = baker.make(models.Genre)
+
+        self.book1 = baker.make(models.Book, author=self.user1, genre=self.genre1)
+
+        self.user1_client = APIClient()
+        self.admin_client = APIClient()
+        self.anon = APIClient()
+
+        self.user1_client.force_authenticate(user=self.user1)
+        self.admin_client.force_authenticate(user=self.admin)
+
+    def test_get_genres_auth(self):
+        response = self.user1_client.get(path="/api/genres/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([genre["id"] for genre in response.json()["results"]], [self.genre1.id, self.genre2.id])
+
+    def test_retrieve_genre_auth(self):
+        response = self.user1_client.get(path=f"/api/genres/{self.genre1.id}/")
+        res_json = response.json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(res_json["name"], self.genre1.name)
+        self.assertEqual([book["id"] for book in res_json["books_by_genre"]], [self.book1.id])
+
+    def test_retrieve_genre_sparse_fields(self):
+        response = self.user1_client.get(path=f"/api/genres/{self.genre1.id}/", data={"fields": "id,title"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["books_by_genre"], [{"id": self.book1.id, "title": self.book1.title}])
+
+    def test_get_genres_unauth(self):
+        response = self.anon.get(path="/api/genres/")
+        expected_json = {"detail": "Authentication credentials were not provided."}
+
+        self.assertEqual(response.status_code, 401)
+        self.assertJSONEqual(response.content, expected_json)
+
+    def test_user_tries_create_genre(self):
+        response = self.user1_client.post(path="/api/genres/", data={"name": "Poetry"}, format="json")
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_retrieve_genre_is_cached(self):
+        path = f"/api/genres/{self.genre1.id}/"
+        response = self.user1_client.get(path=path)
+
+        with self.assertNumQueries(0):
+            cached = self.user1_client.get(path=path)
+
+        self.assertEqual(cached.status_code, 200)
+        self.assertJSONEqual(cached.content, response.json())
+        self.assertEqual(cached["ETag"], response["ETag"])
+
+    def test_retrieve_genre_not_modified(self):
+        path = f"/api/genres/{self.genre1.id}/"
+        etag = self.user1_client.get(path=path)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.user1_client.get(path=path, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_new_book_invalidates_genre(self):
+        path = f"/api/genres/{self.genre1.id}/"
+        etag = self.user1_client.get(path=path)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            book2 = baker.make(models.Book, author=self.user1, genre=self.genre1)
+
+        response = self.user1_client.get(path=path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertCountEqual([book["id"] for book in response.json()["books_by_genre"]], [self.book1.id, book2.id])
+
+    def test_moved_book_invalidates_previous_genre(self):
+        path = f"/api/genres/{self.genre1.id}/"
+        self.user1_client.get(path=path)
+
+        book = models.Book.objects.get(pk=self.book1.pk)
+        book.genre = self.genre2
+        with CaptureQueriesContext(connection) as context, self.captureOnCommitCallbacks(execute=True):
+            book.save()
+        # The previous genre is known from the load
+        self.assertFalse([query["sql"] for query in context.captured_queries if query["sql"].startswith("SELECT")])
+
+        response = self.user1_client.get(path=path)
+        self.assertEqual(response.json()["books_by_genre"], [])
+
+    def test_new_comment_invalidates_genre(self):
+        path = f"/api/genres/{self.genre1.id}/"
+        self.user1_client.get(path=path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user1_client.post(path=f"/api/books/{self.book1.id}/comments/", data={"text": "Text"}, format="json")
+
+        response = self.user1_client.get(path=path)
+        self.assertEqual(response.json()["books_by_genre"][0]["comment_count"], 1)
+
+    def test_deleted_comment_invalidates_genre(self):
+        comment = baker.make(models.Comment, author=self.user1, book=self.book1)
+        models.Book.objects.filter(pk=self.book1.pk).recount_comments()
+        path = f"/api/genres/{self.genre1.id}/"
+        self.user1_client.get(path=path)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.user1_client.delete(path=f"/api/books/{self.book1.id}/comments/{comment.id}/")
+        self.assertEqual(response.status_code, 204)
+
+        response = self.user1_client.get(path=path)
+        self.assertEqual(response.json()["books_by_genre"][0]["comment_count"], 0)
+
+    def test_genre_is_invalidated_after_commit(self):
+        path = f"/api/genres/{self.genre1.id}/"
+        etag = self.user1_client.get(path=path)["ETag"]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            baker.make(models.Book, author=self.user1, genre=self.genre1)
+            # A request before the commit still gets the previous version and caches nothing newer
+            self.assertEqual(self.user1_client.get(path=path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.user1_client.get(path=path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_renamed_genre_invalidates_list(self):
+        self.user1_client.get(path="/api/genres/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.admin_client.patch(path=f"/api/genres/{self.genre2.id}/", data={"name": "Poetry"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+        response = self.user1_client.get(path="/api/genres/")
+        self.assertIn("Poetry", [genre["name"] for genre in response.json()["results"]])
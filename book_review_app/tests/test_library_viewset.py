@@ -29,17 +29,21 @@ class TestLibraryView(APITestCase):
 
     def test_get_libraries_auth(self):
         response = self.user1_client.get(path="/api/libraries/")
-        res_json = response.json()[0]
+        res_json = response.json()["results"][0]
 
         self.assertEqual(response.status_code, 200)
         self.assertIn("id", res_json)
         self.assertIn("author", res_json)
         self.assertIn("name", res_json)
         self.assertIn("address", res_json)
-        self.assertIn("latitude", res_json)
-        self.assertIn("longitude", res_json)
-        self.assertIn("from_hour", res_json)
-        self.assertIn("to_hour", res_json)
+        self.assertNotIn("latitude", res_json)
+        self.assertNotIn("from_hour", res_json)
+
+    def test_retrieve_library_sparse_fields(self):
+        response = self.user1_client.get(path=f"/api/libraries/{self.library1.id}/", data={"fields": "id,from_hour"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertJSONEqual(response.content, {"id": self.library1.id, "from_hour": str(self.library1.from_hour)})
 
     def test_retrieve_library_auth(self):
         response = self.user1_client.get(path=f"/api/libraries/{self.library1.id}/")
@@ -0,0 +1,47 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from model_bakery import baker
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITransactionTestCase
+
+from book_review_app import models
+
+
+# The scenarios run in their own threads, they only see committed data
+class TestLoadTest(APITransactionTestCase):
+    def setUp(self) -> None:
+        self.user1 = baker.make(models.AuthorUser)
+        self.user2 = baker.make(models.AuthorUser)
+        self.genre = baker.make(models.Genre)
+        self.book = baker.make(models.Book, author=self.user2, genre=self.genre)
+        Token.objects.create(user=self.user1)
+
+    def loadtest(self, **options) -> dict:
+        stdout = StringIO()
+        call_command("loadtest", concurrency=1, stdout=stdout, **options)
+        return json.loads(stdout.getvalue())
+
+    def test_report(self):
+        report = self.loadtest(requests=20, mix="book_list=1,book_comments=1,post_comment=1", no_throttle=True)
+
+        routes = report["routes"]
+        self.assertEqual(set(routes), {"GET book-list", "GET book-comment", "POST book-comment"})
+        self.assertEqual(sum(route["requests"] for route in routes.values()), 20)
+        self.assertEqual(routes["GET book-list"]["statuses"], {"200": routes["GET book-list"]["requests"]})
+        self.assertEqual(models.Comment.objects.count(), routes["POST book-comment"]["statuses"]["201"])
+        for route in routes.values():
+            self.assertLessEqual(route["p50_ms"], route["p95_ms"])
+            self.assertLessEqual(route["p95_ms"], route["p99_ms"])
+
+    def test_same_seed_same_scenarios(self):
+        first = self.loadtest(requests=10, mix="book_list=1,genre_page=1", seed=1)
+        second = self.loadtest(requests=10, mix="book_list=1,genre_page=1", seed=1)
+
+        self.assertEqual({route: value["requests"] for route, value in first["routes"].items()}, {route: value["requests"] for route, value in second["routes"].items()})
+
+    def test_bad_mix(self):
+        with self.assertRaises(CommandError):
+            self.loadtest(mix="book_list=1,delete_everything=1")
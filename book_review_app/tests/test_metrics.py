@@ -0,0 +1,86 @@
+import threading
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from model_bakery import baker
+from rest_framework.test import APIClient, APITestCase
+
+from book_review_app import models
+from book_review_app.metrics import PHASES
+from book_review_app.middleware import TimingMiddleware
+
+
+def parse_server_timing(header: str) -> dict:
+    metrics = {}
+    for item in header.split(", "):
+        name, *params = item.split(";")
+        metrics[name] = dict(param.split("=", 1) for param in params)
+    return metrics
+
+
+class TestMetrics(APITestCase):
+    def setUp(self) -> None:
+        self.user1 = baker.make(models.AuthorUser)
+        self.admin = baker.make(models.AuthorUser, is_staff=True)
+        self.book = baker.make(models.Book, author=self.user1, genre=baker.make(models.Genre))
+
+        self.user1_client = APIClient()
+        self.admin_client = APIClient()
+
+        self.user1_client.force_authenticate(user=self.user1)
+        self.admin_client.force_authenticate(user=self.admin)
+
+    def test_server_timing(self):
+        response = self.user1_client.get(path=f"/api/books/{self.book.id}/")
+
+        metrics = parse_server_timing(response["Server-Timing"])
+        self.assertEqual(list(metrics), list(PHASES))
+        self.assertEqual(metrics["db"]["desc"], '"2 queries"')
+        for phase in PHASES:
+            self.assertGreaterEqual(float(metrics[phase]["dur"]), 0)
+        self.assertGreater(float(metrics["total"]["dur"]), float(metrics["db"]["dur"]))
+
+    def test_server_timing_other_thread(self):
+        threads = []
+
+        def query():
+            threads.append(threading.get_ident())
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+
+        def view(request):
+            async_to_sync(sync_to_async(query, thread_sensitive=False))()
+            return HttpResponse()
+
+        response = TimingMiddleware(view)(RequestFactory().get("/"))
+
+        self.assertNotEqual(threads, [threading.get_ident()])
+        self.assertEqual(parse_server_timing(response["Server-Timing"])["db"]["desc"], '"1 queries"')
+
+    def test_server_timing_unresolved(self):
+        response = self.user1_client.get(path="/api/nowhere/")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+    def test_metrics_per_route(self):
+        for _ in range(3):
+            self.user1_client.get(path="/api/books/")
+        self.user1_client.get(path=f"/api/books/{self.book.id}/comments/")
+
+        response = self.admin_client.get(path="/api/internal/metrics/")
+        self.assertEqual(response.status_code, 200)
+
+        book_list = response.data["book-list"]
+        self.assertEqual(set(book_list), {*PHASES, "queries"})
+        self.assertEqual(book_list["total"]["count"], 3)
+        self.assertEqual(book_list["total"]["buckets"]["+Inf"], 3)
+        self.assertEqual(book_list["queries"]["buckets"]["1"], 3)
+        self.assertEqual(response.data["book-comment"]["total"]["count"], 1)
+
+    def test_metrics_admin_only(self):
+        response = self.user1_client.get(path="/api/internal/metrics/")
+
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,51 @@
+from model_bakery import baker
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+
+from book_review_app import models
+from book_review_app.permissions import IsAuthorOrReadOnly, IsOwnProfileOrReadOnly
+
+
+class TestPermissions(APITestCase):
+    def setUp(self) -> None:
+        self.user1 = baker.make(models.AuthorUser)
+        self.user2 = baker.make(models.AuthorUser)
+        genre = baker.make(models.Genre)
+
+        self.book = baker.make(models.Book, author=self.user1, genre=genre)
+        baker.make(models.Comment, author=self.user1, book=self.book)
+        baker.make(models.Library, author=self.user1)
+        baker.make(models.Library, author=self.user2)
+
+        self.user1_client = APIClient()
+        self.user1_client.force_authenticate(user=self.user1)
+
+    def request(self, user):
+        request = APIRequestFactory().patch("/")
+        request.user = user
+        return request
+
+    def test_no_queries(self):
+        objects = [models.Book.objects.get(), models.Comment.objects.get(), models.Library.objects.get(author=self.user1)]
+        for obj in objects:
+            with self.subTest(model=type(obj).__name__), self.assertNumQueries(0):
+                self.assertTrue(IsAuthorOrReadOnly().has_object_permission(self.request(self.user1), None, obj))
+                self.assertFalse(IsAuthorOrReadOnly().has_object_permission(self.request(self.user2), None, obj))
+
+        user = models.AuthorUser.objects.get(id=self.user1.id)
+        with self.assertNumQueries(0):
+            self.assertTrue(IsOwnProfileOrReadOnly().has_object_permission(self.request(self.user1), None, user))
+            self.assertFalse(IsOwnProfileOrReadOnly().has_object_permission(self.request(self.user2), None, user))
+
+    def test_mine_filter(self):
+        baker.make(models.Book, author=self.user2, genre=self.book.genre)
+
+        for path, expected in [("/api/libraries/", 2), ("/api/libraries/?mine=true", 1), ("/api/books/?mine=1", 1), ("/api/books/?mine=false", 2)]:
+            with self.subTest(path=path):
+                results = self.user1_client.get(path=path).json()["results"]
+                self.assertEqual(len(results), expected)
+                if expected == 1:
+                    self.assertEqual(results[0]["author"], self.user1.id)
+
+        response = self.user1_client.get(path="/api/libraries/?mine=maybe")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"mine": ["Must be a valid boolean."]})
@@ -0,0 +1,119 @@
+from model_bakery import baker
+from rest_framework.test import APIClient, APITestCase
+
+from book_review_app import models, utils
+from book_review_app.tests.query_budget import QueryBudgetMixin
+
+
+class TestQueryBudget(QueryBudgetMixin, APITestCase):
+    """
+    Every endpoint runs the same number of queries whatever the amount of authors, books, comments and libraries.
+    Writes include the SAVEPOINT and RELEASE of WriteRetryMixin's transaction
+    """
+
+    def setUp(self) -> None:
+        self.author = baker.make(models.AuthorUser)
+        self.other = baker.make(models.AuthorUser)
+        self.genre = baker.make(models.Genre)
+        self.book = baker.make(models.Book, author=self.author, genre=self.genre)
+        self.comment = baker.make(models.Comment, author=self.author, book=self.book)
+        self.library = baker.make(models.Library, author=self.author)
+
+        self.author_client = APIClient()
+        self.author_client.force_authenticate(user=self.author)
+
+    def new_comment_path(self, size: int):
+        comment = baker.make(models.Comment, author=self.author, book=self.book)
+        return f"/api/books/{self.book.id}/comments/{comment.id}/"
+
+    # AuthorViewSet
+
+    def test_author_list(self):
+        self.assertConstantQueries(self.author_client, "/api/authors/", 1)
+
+    def test_author_retrieve(self):
+        self.assertConstantQueries(self.author_client, f"/api/authors/{self.other.id}/", 1)
+
+    def test_author_update(self):
+        self.assertConstantQueries(self.author_client, f"/api/authors/{self.author.id}/", 5, "patch", data={"name": "Name"}, format="json")
+
+    # BookViewSet
+
+    def test_book_list(self):
+        self.assertConstantQueries(self.author_client, "/api/books/", 1)
+
+    def test_book_list_sparse(self):
+        self.assertConstantQueries(self.author_client, "/api/books/?fields=id,title", 1)
+
+    def test_book_retrieve(self):
+        self.assertConstantQueries(self.author_client, f"/api/books/{self.book.id}/", 2)
+
+    def test_book_create(self):
+        self.assertConstantQueries(self.author_client, "/api/books/", 5, "post", 201, data={**utils.get_new_book_data(), "genre": self.genre.name}, format="json")
+
+    def test_book_bulk_create(self):
+        data = [{**utils.get_new_book_data(), "genre": self.genre.name} for _ in range(3)]
+        self.assertConstantQueries(self.author_client, "/api/books/bulk/", 7, "post", 201, data=data, format="json")
+
+    def test_book_update(self):
+        self.assertConstantQueries(self.author_client, f"/api/books/{self.book.id}/", 8, "patch", data={"title": "Title"}, format="json")
+
+    def test_book_delete(self):
+        def path(size: int):
+            book = baker.make(models.Book, author=self.author, genre=self.genre)
+            baker.make(models.Comment, author=self.other, book=book, _quantity=size)
+            return f"/api/books/{book.id}/"
+
+        self.assertConstantQueries(self.author_client, path, 7, "delete", 204)
+
+    # Comment actions of BookViewSet
+
+    def test_book_comments(self):
+        self.assertConstantQueries(self.author_client, f"/api/books/{self.book.id}/comments/", 2)
+
+    def test_comment_create(self):
+        path = f"/api/books/{self.book.id}/comments/"
+        self.assertConstantQueries(self.author_client, path, 8, "post", 201, data={"text": "Text"}, format="json")
+
+    def test_comment_bulk_create(self):
+        path = f"/api/books/{self.book.id}/comments/bulk/"
+        self.assertConstantQueries(self.author_client, path, 10, "post", 201, data=[{"text": "Text"}] * 3, format="json")
+
+    def test_comment_retrieve(self):
+        self.assertConstantQueries(self.author_client, f"/api/books/{self.book.id}/comments/{self.comment.id}/", 1)
+
+    def test_comment_update(self):
+        path = f"/api/books/{self.book.id}/comments/{self.comment.id}/"
+        self.assertConstantQueries(self.author_client, path, 8, "patch", data={"text": "Text"}, format="json")
+
+    def test_comment_delete(self):
+        self.assertConstantQueries(self.author_client, self.new_comment_path, 7, "delete", 204)
+
+    # GenreViewSet
+
+    def test_genre_list(self):
+        self.assertConstantQueries(self.author_client, "/api/genres/", 1)
+
+    def test_genre_retrieve(self):
+        self.assertConstantQueries(self.author_client, f"/api/genres/{self.genre.id}/", 2)
+
+    # LibraryViewSet
+
+    def test_library_list(self):
+        self.assertConstantQueries(self.author_client, "/api/libraries/", 1)
+
+    def test_library_retrieve(self):
+        self.assertConstantQueries(self.author_client, f"/api/libraries/{self.library.id}/", 1)
+
+    def test_library_create(self):
+        data = {"name": "Name", "address": "Address", "from_hour": "09:00", "to_hour": "18:00"}
+        self.assertConstantQueries(self.author_client, "/api/libraries/", 3, "post", 201, data=data, format="json")
+
+    def test_library_update(self):
+        self.assertConstantQueries(self.author_client, f"/api/libraries/{self.library.id}/", 4, "patch", data={"name": "Name"}, format="json")
+
+    def test_library_delete(self):
+        def path(size: int):
+            return f"/api/libraries/{baker.make(models.Library, author=self.author).id}/"
+
+        self.assertConstantQueries(self.author_client, path, 4, "delete", 204)
@@ -0,0 +1,108 @@
+import datetime
+import io
+import uuid
+from decimal import Decimal
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from django.test import SimpleTestCase
+from model_bakery import baker
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+
+from book_review_app import models, renderers
+from book_review_app.renderers import FastJSONParser, FastJSONRenderer
+
+
+class TestFastJSONRenderer(SimpleTestCase):
+    data = {
+        "decimal": Decimal("0.7522200000000000"),
+        "utc": datetime.datetime(2021, 12, 26, 10, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+        "moscow": datetime.datetime(2021, 12, 26, 10, 30, tzinfo=ZoneInfo("Europe/Moscow")),
+        "naive": datetime.datetime(2021, 12, 26, 10, 30),
+        "date": datetime.date(2021, 12, 26),
+        "time": datetime.time(9, 30),
+        "uuid": uuid.UUID("12345678123456781234567812345678"),
+        "text": "Мастер и Маргарита     \x1f \" \\ /",
+        "numbers": [1, -2, 0.5, 2**70, None, True],
+        1: "int key",
+    }
+
+    def assertSameBytes(self, data, *args):
+        self.assertEqual(FastJSONRenderer().render(data, *args), JSONRenderer().render(data, *args))
+
+    def test_same_bytes(self):
+        self.assertSameBytes(self.data)
+        self.assertSameBytes([self.data, {"nested": [self.data]}])
+        self.assertSameBytes(None)
+
+    def test_same_bytes_without_orjson(self):
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertSameBytes(self.data)
+
+    def test_indent(self):
+        self.assertSameBytes(self.data, "application/json; indent=4")
+
+    def test_non_finite_floats(self):
+        data = {"numbers": [float("nan"), float("inf"), float("-inf")]}
+
+        # The only difference: JSONRenderer refuses them, orjson renders null
+        with self.assertRaises(ValueError):
+            JSONRenderer().render(data)
+        self.assertEqual(FastJSONRenderer().render(data), b'{"numbers":[null,null,null]}')
+
+    def test_non_strict(self):
+        renderer = FastJSONRenderer()
+        renderer.strict = False
+
+        self.assertEqual(renderer.render({"number": float("nan")}), b'{"number":NaN}')
+
+    def test_aware_time(self):
+        data = {"time": datetime.time(9, 30, tzinfo=datetime.timezone.utc)}
+
+        with self.assertRaises(ValueError):
+            JSONRenderer().render(data)
+        with self.assertRaises(ValueError):
+            FastJSONRenderer().render(data)
+
+
+class TestFastJSONParser(SimpleTestCase):
+    def test_parse(self):
+        body = '{"title": "Собачье сердце", "year": 1925, "tags": [1.5, null, true]}'.encode()
+
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+
+    def test_parse_error(self):
+        for body in (b'{"title": ', b'{"year": NaN}'):
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                FastJSONParser().parse(io.BytesIO(body))
+
+    def test_parse_other_charset(self):
+        body = '{"title": "Собачье сердце"}'.encode("utf-16")
+
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(body), parser_context={"encoding": "utf-16"}), {"title": "Собачье сердце"})
+
+
+class TestFastJSONViews(APITestCase):
+    def setUp(self) -> None:
+        self.user1 = baker.make(models.AuthorUser)
+        self.genre = baker.make(models.Genre)
+        self.book1 = baker.make(models.Book, author=self.user1, genre=self.genre)
+
+        self.user1_client = APIClient()
+        self.user1_client.force_authenticate(user=self.user1)
+
+    def test_create_and_render(self):
+        data = {"title": "Вам и не снилось", "year": 1984, "genre": self.genre.name}
+        response = self.user1_client.post(path="/api/books/", data=data, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+
+    def test_malformed_body(self):
+        response = self.user1_client.post(path="/api/books/", data=b'{"title": ', content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.json()["detail"].startswith("JSON parse error"))
@@ -0,0 +1,121 @@
+from unittest import mock
+
+from django.db import DatabaseError, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from model_bakery import baker
+from rest_framework.test import APIClient, APITransactionTestCase
+
+from book_review_api.replicas import ReplicaPool, pool
+from book_review_app import models
+
+
+# Replicas are mirrors of the test database with connections of their own, they only see committed data
+@override_settings(DATABASE_REPLICAS=["replica1", "replica2"])
+class TestReplicas(APITransactionTestCase):
+    databases = {"default", "replica1", "replica2"}
+
+    def setUp(self) -> None:
+        pool.clear()
+        self.user1 = baker.make(models.AuthorUser)
+        self.user2 = baker.make(models.AuthorUser)
+        self.book = baker.make(models.Book, author=self.user1, genre=baker.make(models.Genre))
+
+        self.user1_client = APIClient(REMOTE_ADDR="10.0.0.1")
+        self.user2_client = APIClient(REMOTE_ADDR="10.0.0.2")
+        self.user1_client.force_authenticate(user=self.user1)
+        self.user2_client.force_authenticate(user=self.user2)
+
+    def queries_per_database(self, request) -> dict:
+        contexts = {alias: CaptureQueriesContext(connections[alias]) for alias in self.databases}
+        for context in contexts.values():
+            context.__enter__()
+        try:
+            response = request()
+        finally:
+            for context in contexts.values():
+                context.__exit__(None, None, None)
+        return response, {alias: len(context) for alias, context in contexts.items()}
+
+    def test_reads_go_to_replicas(self):
+        paths = ["/api/books/", f"/api/books/{self.book.id}/", f"/api/books/{self.book.id}/comments/", "/api/libraries/", "/api/authors/"]
+        for path in paths:
+            with self.subTest(path=path):
+                response, queries = self.queries_per_database(lambda: self.user1_client.get(path=path))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(queries["default"], 0)
+                self.assertGreater(queries["replica1"] + queries["replica2"], 0)
+
+    def test_least_loaded_replica(self):
+        self.assertEqual(pool.acquire(), "replica1")
+        _, queries = self.queries_per_database(lambda: self.user1_client.get(path="/api/books/"))
+        pool.release("replica1")
+
+        self.assertEqual(queries, {"default": 0, "replica1": 0, "replica2": 1})
+
+    def test_read_your_writes(self):
+        response, queries = self.queries_per_database(
+            lambda: self.user1_client.post(path=f"/api/books/{self.book.id}/comments/", data={"text": "Text"}, format="json")
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(queries["replica1"] + queries["replica2"], 0)
+
+        # The writer reads from the primary for a while, other clients keep reading from replicas
+        _, queries = self.queries_per_database(lambda: self.user1_client.get(path=f"/api/books/{self.book.id}/comments/"))
+        self.assertEqual(queries["replica1"] + queries["replica2"], 0)
+        _, queries = self.queries_per_database(lambda: self.user2_client.get(path=f"/api/books/{self.book.id}/comments/"))
+        self.assertEqual(queries["default"], 0)
+
+    def test_failed_writes_do_not_pin(self):
+        anonymous_client = APIClient(REMOTE_ADDR="10.0.0.1")
+        anonymous_client.credentials(HTTP_AUTHORIZATION="Token made-up")
+        requests = [
+            lambda: self.user1_client.post(path=f"/api/books/{self.book.id}/comments/", data={}, format="json"),
+            lambda: self.user1_client.delete(path=f"/api/books/{self.book.id + 1}/"),
+            lambda: anonymous_client.post(path=f"/api/books/{self.book.id}/comments/", data={"text": "Text"}, format="json"),
+        ]
+        with mock.patch("book_review_api.replicas.pins") as pins:
+            for request in requests:
+                self.assertGreaterEqual(request().status_code, 400)
+        pins.return_value.set.assert_not_called()
+
+        _, queries = self.queries_per_database(lambda: self.user1_client.get(path=f"/api/books/{self.book.id}/comments/"))
+        self.assertEqual(queries["default"], 0)
+
+    def test_invalid_credentials_read_primary(self):
+        client = APIClient(REMOTE_ADDR="10.0.0.1")
+        client.credentials(HTTP_AUTHORIZATION="Token made-up")
+
+        response, queries = self.queries_per_database(lambda: client.get(path="/api/books/"))
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(queries["replica1"] + queries["replica2"], 0)
+
+    def test_health_check_interval(self):
+        with mock.patch.object(ReplicaPool, "is_healthy", return_value=True) as is_healthy:
+            for _ in range(3):
+                pool.release(pool.acquire())
+            self.assertEqual(is_healthy.call_count, 1)
+
+            with override_settings(REPLICA_HEALTH_CHECK_SECONDS=0):
+                pool.clear()
+                for _ in range(3):
+                    pool.release(pool.acquire())
+            self.assertEqual(is_healthy.call_count, 4)
+
+    def test_unhealthy_replica_is_skipped(self):
+        healthy = ReplicaPool.is_healthy
+        with mock.patch.object(ReplicaPool, "is_healthy", side_effect=lambda alias: alias != "replica1" and healthy(alias)):
+            self.assertEqual(pool.acquire(), "replica2")
+            pool.release("replica2")
+
+        # Left out for REPLICA_RETRY_SECONDS even though it is healthy again and as loaded as replica2
+        self.assertEqual(pool.acquire(), "replica2")
+        pool.release("replica2")
+
+        with mock.patch.object(connections["replica1"], "ensure_connection", side_effect=DatabaseError):
+            self.assertFalse(ReplicaPool.is_healthy("replica1"))
+
+    def test_search_reads_primary(self):
+        _, queries = self.queries_per_database(lambda: self.user1_client.get(path="/api/search/", data={"q": "title"}))
+        self.assertEqual(queries["replica1"] + queries["replica2"], 0)
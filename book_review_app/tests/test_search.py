@@ -0,0 +1,122 @@
+from django.test import override_settings
+from model_bakery import baker
+from rest_framework.test import APIClient, APITestCase
+
+from book_review_app import models
+
+
+class SearchTestsMixin:
+    def setUp(self) -> None:
+        self.user1 = baker.make(models.AuthorUser)
+        self.user2 = baker.make(models.AuthorUser)
+        genre = baker.make(models.Genre)
+
+        self.book1 = baker.make(models.Book, author=self.user1, genre=genre, title="Мастер и Маргарита")
+        self.book2 = baker.make(models.Book, author=self.user2, genre=genre, title="Собачье сердце")
+
+        self.comment1 = baker.make(models.Comment, author=self.user2, book=self.book1, text="Маргарита прекрасна, а кот Бегемот лучше всех")
+        self.comment2 = baker.make(models.Comment, author=self.user1, book=self.book2, text="Про собаку, но сердце доброе")
+        self.comment3 = baker.make(models.Comment, author=self.user1, book=self.book1, text="Кот, кот и ещё раз кот")
+
+        self.user1_client = APIClient()
+        self.anon = APIClient()
+        self.user1_client.force_authenticate(user=self.user1)
+
+    def search(self, **params):
+        response = self.user1_client.get(path="/api/search/", data=params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def hits(self, **params):
+        return [(hit["type"], hit["id"]) for hit in self.search(**params)["results"]]
+
+    def test_search_books_and_comments(self):
+        self.assertCountEqual(self.hits(q="маргарита"), [("book", self.book1.id), ("comment", self.comment1.id)])
+
+    def test_search_requires_every_word(self):
+        self.assertEqual(self.hits(q="кот бегемот"), [("comment", self.comment1.id)])
+
+    def test_search_ranked(self):
+        self.assertEqual(self.hits(q="кот"), [("comment", self.comment3.id), ("comment", self.comment1.id)])
+
+    def test_search_by_type(self):
+        self.assertEqual(self.hits(q="сердце", type="book"), [("book", self.book2.id)])
+        self.assertEqual(self.hits(q="сердце", type="comment"), [("comment", self.comment2.id)])
+
+    def test_search_hit(self):
+        hit = self.search(q="бегемот")["results"][0]
+
+        self.assertEqual(hit["book"], self.book1.id)
+        self.assertIn("<mark>Бегемот</mark>", hit["snippet"])
+
+    def test_search_snippet_escaped(self):
+        response = self.user1_client.post(
+            path=f"/api/books/{self.book2.id}/comments/", data={"text": "great <img src=x onerror=alert(1)> & <b>book</b>"}, format="json"
+        )
+        self.assertEqual(response.status_code, 201)
+
+        snippet = self.search(q="great")["results"][0]["snippet"]
+        self.assertEqual(snippet, "<mark>great</mark> &lt;img src=x onerror=alert(1)&gt; &amp; &lt;b&gt;book&lt;/b&gt;")
+
+    def test_search_paginated(self):
+        res_json = self.search(q="кот", limit=1)
+
+        self.assertEqual(res_json["count"], 2)
+        self.assertEqual(len(res_json["results"]), 1)
+        self.assertEqual(self.search(q="кот", limit=1, offset=1)["results"][0]["id"], self.comment1.id)
+
+    def test_search_follows_edits(self):
+        self.comment2.text = "Передумал, собака отличная"
+        self.comment2.save()
+        self.book1.delete()
+
+        self.assertEqual(self.hits(q="маргарита"), [])
+        self.assertEqual(self.hits(q="сердце"), [("book", self.book2.id)])
+        self.assertEqual(self.hits(q="отличная"), [("comment", self.comment2.id)])
+
+    def test_search_forgets_cascaded_comments(self):
+        self.book1.delete()
+        self.assertEqual(self.search(q="кот")["count"], 0)
+
+        self.user1.delete()
+        self.assertEqual(self.search(q="сердце", type="comment")["count"], 0)
+
+    def test_search_forgets_deleted_comment(self):
+        response = self.user1_client.delete(path=f"/api/books/{self.book1.id}/comments/{self.comment3.id}/")
+
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.search(q="кот")["count"], 1)
+
+    def test_search_bulk_created(self):
+        response = self.user1_client.post(path=f"/api/books/{self.book2.id}/comments/bulk/", data=[{"text": "Шариков"}], format="json")
+
+        self.assertEqual(self.hits(q="шариков"), [("comment", response.json()[0]["id"])])
+
+    def test_search_syntax_is_not_interpreted(self):
+        self.assertEqual(self.hits(q='кот" OR "сердце'), [])
+
+    def test_search_without_query(self):
+        response = self.user1_client.get(path="/api/search/", data={"q": "!!!"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, {"q": ["This field is required."]})
+
+    def test_search_wrong_type(self):
+        response = self.user1_client.get(path="/api/search/", data={"q": "кот", "type": "author"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_unauth(self):
+        response = self.anon.get(path="/api/search/", data={"q": "кот"})
+
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(SEARCH_BACKEND="fts5")
+class TestFTS5Search(SearchTestsMixin, APITestCase):
+    pass
+
+
+@override_settings(SEARCH_BACKEND="python")
+class TestPythonSearch(SearchTestsMixin, APITestCase):
+    pass
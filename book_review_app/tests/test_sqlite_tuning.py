@@ -0,0 +1,87 @@
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.test import override_settings
+from model_bakery import baker
+from rest_framework.test import APIClient, APITestCase
+
+from book_review_app import models, utils, views
+
+
+class TestSQLiteTuning(APITestCase):
+    def setUp(self) -> None:
+        self.user1 = baker.make(models.AuthorUser)
+        self.genre = baker.make(models.Genre)
+
+        self.user1_client = APIClient()
+        self.user1_client.force_authenticate(user=self.user1)
+
+        self.book_data = {**utils.get_new_book_data(), "genre": self.genre.name}
+
+    def test_pragmas(self):
+        with connection.cursor() as cursor:
+            for pragma, expected in [("busy_timeout", 5000), ("synchronous", 1), ("temp_store", 2), ("cache_size", -65536)]:
+                with self.subTest(pragma=pragma):
+                    cursor.execute(f"PRAGMA {pragma}")
+                    self.assertEqual(cursor.fetchone()[0], expected)
+
+    def post_book_failing_with(self, *errors):
+        """
+        perform_create raises the errors one by one after creating the book, then works
+        """
+        perform_create, calls = views.BookViewSet.perform_create, []
+
+        def failing_perform_create(view, serializer):
+            calls.append(serializer)
+            perform_create(view, serializer)
+            if len(calls) <= len(errors):
+                raise errors[len(calls) - 1]
+
+        with mock.patch.object(views.BookViewSet, "perform_create", failing_perform_create):
+            return self.user1_client.post(path="/api/books/", data=self.book_data, format="json"), calls
+
+    @override_settings(WRITE_RETRY_BACKOFF=0)
+    def test_locked_write_retried(self):
+        response, calls = self.post_book_failing_with(OperationalError("database is locked"), OperationalError("database is locked"))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(models.Book.objects.count(), 1)  # the failed attempts are rolled back
+
+    @override_settings(WRITE_RETRY_BACKOFF=0, WRITE_RETRY_ATTEMPTS=2)
+    def test_locked_write_gives_up(self):
+        with self.assertRaises(OperationalError):
+            self.post_book_failing_with(*[OperationalError("database is locked")] * 2)
+
+        self.assertEqual(models.Book.objects.count(), 0)
+
+    @override_settings(WRITE_RETRY_BACKOFF=0)
+    def test_locked_table_retried(self):
+        response, calls = self.post_book_failing_with(OperationalError("database table is locked: book_review_app_book"))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(calls), 2)
+
+    def test_other_errors_not_retried(self):
+        for error in ["no such table: book_review_app_book", "no such table: locked", "database is locked out"]:
+            with self.subTest(error=error), self.assertRaises(OperationalError):
+                self.post_book_failing_with(OperationalError(error))
+
+        self.assertEqual(models.Book.objects.count(), 0)
+
+    @override_settings(WRITE_RETRY_BACKOFF=0)
+    def test_retried_write_invalidates_once(self):
+        with mock.patch("book_review_app.cache.bump_generation") as bump_generation:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.post_book_failing_with()
+            once = bump_generation.call_args_list[:]
+            bump_generation.reset_mock()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                response, calls = self.post_book_failing_with(OperationalError("database is locked"))
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(once)
+        # The bumps of the rolled back attempt are dropped with it
+        self.assertEqual(bump_generation.call_args_list, once)
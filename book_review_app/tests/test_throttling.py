@@ -0,0 +1,123 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from model_bakery import baker
+from rest_framework.test import APIClient, APITestCase
+
+from book_review_app import models, utils
+from book_review_app.throttling import CacheBucketStore, LocMemBucketStore
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": rates})
+
+
+class TestBucketStores(SimpleTestCase):
+    def assertBucket(self, store, clock):
+        with mock.patch(clock, return_value=100.0):
+            self.assertEqual([store.take("key", 2, 60) for _ in range(3)], [0, 0, 30.0])
+            self.assertEqual(store.take("other", 2, 60), 0)
+        with mock.patch(clock, return_value=130.0):
+            self.assertEqual(store.take("key", 2, 60), 0)
+            self.assertEqual(store.take("key", 2, 60), 30.0)
+
+    def test_locmem(self):
+        self.assertBucket(LocMemBucketStore(), "book_review_app.throttling.time.monotonic")
+
+    def test_locmem_evicts(self):
+        store = LocMemBucketStore(max_entries=1)
+        store.take("key", 1, 60)
+        store.take("other", 1, 60)
+
+        self.assertEqual(store.take("key", 1, 60), 0)
+
+    def test_cache(self):
+        store = CacheBucketStore()
+        store.clear()
+        self.assertBucket(store, "book_review_app.throttling.time.time")
+
+    def test_cache_clear_keeps_other_entries_of_the_alias(self):
+        store = CacheBucketStore()
+        caches["default"].set("other", "value")
+        store.take("key", 1, 60)
+
+        store.clear()
+
+        self.assertEqual(store.take("key", 1, 60), 0)
+        self.assertEqual(caches["default"].get("other"), "value")
+
+
+class TestThrottling(APITestCase):
+    def setUp(self) -> None:
+        self.user1 = baker.make(models.AuthorUser)
+        self.user2 = baker.make(models.AuthorUser)
+        self.book = baker.make(models.Book, author=self.user1, genre=baker.make(models.Genre))
+
+        self.user1_client = APIClient()
+        self.user2_client = APIClient()
+        self.anon = APIClient()
+
+        self.user1_client.force_authenticate(user=self.user1)
+        self.user2_client.force_authenticate(user=self.user2)
+
+    @throttle_rates(read="2/min", write="1/min")
+    def test_reads_per_user(self):
+        statuses = [self.user1_client.get(path="/api/books/").status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+        response = self.user1_client.get(path="/api/books/")
+        self.assertEqual(int(response["Retry-After"]), 30)
+        self.assertEqual(self.user2_client.get(path="/api/books/").status_code, 200)
+
+        # Writes have their own bucket
+        response = self.user1_client.patch(path=f"/api/books/{self.book.id}/", data={"title": "Title"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        response = self.user1_client.patch(path=f"/api/books/{self.book.id}/", data={"title": "Title"}, format="json")
+        self.assertEqual(response.status_code, 429)
+
+    @throttle_rates(register="2/hour")
+    def test_register_per_ip(self):
+        statuses = [self.anon.post(path="/api/v1/register/", data=utils.get_new_user_data(), format="json").status_code for _ in range(3)]
+
+        self.assertEqual(statuses, [201, 201, 429])
+        self.assertEqual(models.AuthorUser.objects.count(), 4)
+
+        other_ip = self.anon.post(path="/api/v1/register/", data=utils.get_new_user_data(), format="json", REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(other_ip.status_code, 201)
+
+    @throttle_rates(register="2/hour")
+    def test_register_spoofed_forwarded_for(self):
+        def register(**headers):
+            return self.anon.post(path="/api/v1/register/", data=utils.get_new_user_data(), format="json", **headers).status_code
+
+        statuses = [register(HTTP_X_FORWARDED_FOR=f"10.0.0.{i}") for i in range(3)]
+        self.assertEqual(statuses, [201, 201, 429])
+
+        with self.settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": None}):
+            self.assertEqual(register(HTTP_X_FORWARDED_FOR="10.0.0.3"), 429)
+
+    @override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": {"register": "2/hour"}, "NUM_PROXIES": 1})
+    def test_register_behind_proxy(self):
+        def register(forwarded_for):
+            return self.anon.post(path="/api/v1/register/", data=utils.get_new_user_data(), format="json", HTTP_X_FORWARDED_FOR=forwarded_for).status_code
+
+        # The client is the last entry, the one added by the proxy
+        self.assertEqual([register(f"10.0.0.{i}, 1.2.3.4") for i in range(3)], [201, 201, 429])
+        self.assertEqual(register("1.2.3.5"), 201)
+
+    @throttle_rates(token_auth="1/min")
+    def test_token_auth_per_ip(self):
+        self.user1.set_password("password")
+        self.user1.save()
+        credentials = {"username": self.user1.username, "password": "password"}
+
+        self.assertEqual(self.anon.post(path="/api/v1/api-token-auth/", data=credentials, format="json").status_code, 200)
+        self.assertEqual(self.anon.post(path="/api/v1/api-token-auth/", data=credentials, format="json").status_code, 429)
+
+    @throttle_rates()
+    def test_unthrottled_scope(self):
+        statuses = {self.user1_client.get(path="/api/books/").status_code for _ in range(5)}
+
+        self.assertEqual(statuses, {200})
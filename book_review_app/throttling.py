@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from book_review_app.cache import bump_generation, get_cache, get_generation
+
+
+class LocMemBucketStore:
+    """
+    Process-local token buckets, LRU evicted. An evicted bucket comes back full
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()  # key -> (tokens, updated at)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: int, period: float) -> float:
+        """
+        Takes a token from the bucket, returns 0 or the number of seconds until the bucket has one
+        """
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens, wait = refill_and_take(tokens, now - updated, capacity, period)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Token buckets in one of settings.CACHES, shared between processes if the backend is.
+    Read and write of a bucket are not atomic, concurrent requests may take the same token.
+    Keys carry a generation of key_prefix, clear() bumps it instead of clearing the whole alias
+    """
+
+    def __init__(self, alias: str = "default", key_prefix: str = "throttle:"):
+        self.alias = alias
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def take(self, key: str, capacity: int, period: float) -> float:
+        now = time.time()
+        key = f"{self.key_prefix}{get_generation(self.key_prefix, self.cache)}:{key}"
+        tokens, updated = self.cache.get(key, (capacity, now))
+        tokens, wait = refill_and_take(tokens, max(0.0, now - updated), capacity, period)
+        self.cache.set(key, (tokens, now), period)  # full again after a period anyway
+        return wait
+
+    def clear(self):
+        bump_generation(self.key_prefix, self.cache)
+
+
+def refill_and_take(tokens: float, elapsed: float, capacity: int, period: float) -> tuple:
+    rate = capacity / period
+    tokens = min(capacity, tokens + elapsed * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket per user (per IP for anonymous requests) and scope. A rate of "100/min" is a bucket of
+    100 tokens refilled at 100 per minute, so bursts up to the full rate are allowed. Buckets live in settings.THROTTLE_STORE
+    """
+
+    def get_rate(self):
+        # Read on every request, SimpleRateThrottle.THROTTLE_RATES is frozen at import
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_ident(self, request):
+        # Without NUM_PROXIES DRF keys on X-Forwarded-For, which any client can set to get a fresh bucket per request
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get("REMOTE_ADDR")
+        return super().get_ident(request)
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.wait_time = get_cache("THROTTLE_STORE").take(self.key, self.num_requests, self.duration)
+        return self.wait_time == 0
+
+    def wait(self):
+        return self.wait_time
+
+
+class ReadThrottle(TokenBucketThrottle):
+    scope = "read"
+
+    def allow_request(self, request, view):
+        return request.method not in SAFE_METHODS or super().allow_request(request, view)
+
+
+class WriteThrottle(TokenBucketThrottle):
+    scope = "write"
+
+    def allow_request(self, request, view):
+        return request.method in SAFE_METHODS or super().allow_request(request, view)
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Per IP even for authenticated requests, for endpoints where the caller has no identity yet
+    """
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+class RegisterThrottle(AnonTokenBucketThrottle):
+    scope = "register"
+
+
+class TokenAuthThrottle(AnonTokenBucketThrottle):
+    scope = "token_auth"
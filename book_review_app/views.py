@@ -1,18 +1,44 @@
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import mixins, status
+from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.serializers import ValidationError
 from rest_framework.views import APIView
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
-from book_review_app import models, serializers
-from book_review_app.permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly, IsOwnProfileOrReadOnly
+from book_review_app import models, search, serializers
+from book_review_app.metrics import registry
+from book_review_app.cache import bump_generation_on_commit, cached_response, conditional_response
+from book_review_app.export import iter_books_ndjson
+from book_review_app.filters import BookFilterBackend, IndexedOrderingFilter, filter_books
+from book_review_app.compiled import compile_serializer
+from book_review_app.mixins import CompiledListMixin, SerializerPerActionMixin, SparseFieldsetMixin, TimingMixin, WriteRetryMixin, only_fields, parse_fields
+from book_review_app.pagination import BookCursorPagination, CommentCursorPagination, SearchPagination
+from book_review_app.permissions import IsAdminOrReadOnly, IsAuthorFilterBackend, IsAuthorOrReadOnly, IsOwnProfileOrReadOnly
+from book_review_app.throttling import RegisterThrottle, TokenAuthThrottle
 
+# Returned by the UPDATE of a comment edit, everything CommentSerializer shows
+COMMENT_COLUMNS = ["id", "author_id", "book_id", "text", "creation_date", "modified_at"]
 
-class LogoutView(APIView):
+
+def without_comments(books: list):
+    """
+    Prefetches the empty comments of books created a moment ago, so BookSerializer doesn't query them
+    """
+    for book in books:
+        book._prefetched_objects_cache = {**getattr(book, "_prefetched_objects_cache", {}), "comments": models.Comment.objects.none()}
+
+
+class LogoutView(TimingMixin, APIView):
     """
     Simple API View to implement token revoking
     """
@@ -26,7 +52,26 @@ class LogoutView(APIView):
         return Response({"detail": "Successfully logged out."}, status=status.HTTP_200_OK)
 
 
-class CreateAuthorViewSet(mixins.CreateModelMixin, GenericViewSet):
+class MetricsView(TimingMixin, APIView):
+    """
+    Histograms of the request phases per route of this process, see book_review_app.metrics
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request: Request):
+        return Response(registry.snapshot())
+
+
+class LoginView(TimingMixin, ObtainAuthToken):
+    """
+    obtain_auth_token throttled per IP, checking a password is slow by design
+    """
+
+    throttle_classes = [TokenAuthThrottle]
+
+
+class CreateAuthorViewSet(TimingMixin, WriteRetryMixin, mixins.CreateModelMixin, GenericViewSet):
     """
     Registration ViewSet. Allows only POST
     """
@@ -34,34 +79,77 @@ class CreateAuthorViewSet(mixins.CreateModelMixin, GenericViewSet):
     queryset = models.AuthorUser.objects.all()
     serializer_class = serializers.AuthorSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterThrottle]
 
 
-class AuthorViewSet(ModelViewSet, GenericViewSet):
+class AuthorViewSet(TimingMixin, WriteRetryMixin, ModelViewSet, GenericViewSet):
+    replica_reads = True
     queryset = models.AuthorUser.objects.all()
     serializer_class = serializers.AuthorSerializer
     permission_classes = [IsAuthenticated, IsOwnProfileOrReadOnly]
     http_method_names = ["get", "head", "patch"]
 
 
-class BookViewSet(ModelViewSet, GenericViewSet):
+class BookViewSet(TimingMixin, WriteRetryMixin, CompiledListMixin, SparseFieldsetMixin, SerializerPerActionMixin, ModelViewSet, GenericViewSet):
+    replica_reads = True
     queryset = models.Book.objects.all()
     serializer_class = serializers.BookSerializer
+    serializer_classes = {"list": serializers.BookListSerializer}
     permission_classes = [IsAuthenticated, IsAuthorOrReadOnly]
+    pagination_class = BookCursorPagination
+    filter_backends = [BookFilterBackend, IsAuthorFilterBackend, IndexedOrderingFilter]
+    ordering_fields = ["publication_date", "title", "id"]  # (field, id) indexed and mostly distinct, see IndexedOrderingFilter
+    ordering = ["-publication_date", "-id"]
+    sparse_fieldset_columns = ("modified_at",)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ("update", "partial_update"):
+            # BookSerializer nests every comment of the book
+            return queryset.prefetch_related("comments")
+        return queryset
+
+    def book_conditional_response(self, request: Request, book: models.Book, build):
+        """
+        304 by Book.modified_at, which moves with every change of the book and its comments
+        """
+        return conditional_response(request, f"book:{book.pk}:{book.modified_at.isoformat()}", book.modified_at, build)
+
+    def retrieve(self, request, *args, **kwargs):
+        book = self.get_object()
+        return self.book_conditional_response(request, book, lambda: self.get_retrieve_response(book))
+
+    def get_retrieve_response(self, book: models.Book):
+        fields = self.get_sparse_fields()
+        if fields is None or "comments" in fields:
+            prefetch_related_objects([book], "comments")
+        return Response(self.get_serializer(book).data)
+
+    def perform_create(self, serializer):
+        book = serializer.save(author=self.request.user)
+        without_comments([book])
+
+    def get_bulk_serializer(self, data):
+        return self.get_serializer(data=data, many=True, allow_empty=False, max_length=settings.BULK_CREATE_MAX_BATCH_SIZE)
 
-    def create(self, request, *args, **kwargs):
+    @action(methods=["post"], detail=False, url_path="bulk")
+    def bulk_create(self, request: Request):
         """
-        This section can be moved inside BookSerializer. Somehow I need to deduce genre object by string not by ID (as in PDF)... // Depends on implementations.
+        Creates a list of books by URL like /api/books/bulk/. Nothing is created if any of them is invalid
         """
-        genre_name = request.data.get("genre", None)
-        
-        if not genre_name:
-            return Response({"genre": "This field is required"}, status=status.HTTP_400_BAD_REQUEST)
+        book_serializer = self.get_bulk_serializer(request.data)
+        book_serializer.is_valid(raise_exception=True)
+        books = book_serializer.save(author=request.user)
+        without_comments(books)
+        return Response(book_serializer.data, status.HTTP_201_CREATED)
 
-        genre = models.Genre.objects.filter(name=genre_name).first()
-        if genre:
-            request.data.update({"author": request.user.id, "genre": genre.id})
-            return super().create(request, *args, **kwargs)
-        return Response({"genre": f"{genre_name} not found"}, status=status.HTTP_400_BAD_REQUEST)
+    @action(methods=["get"], detail=False, url_path="export")
+    def export(self, request: Request):
+        """
+        Streams all books with their comments as NDJSON by URL like /api/books/export/?genre=<id>&year=<year>
+        """
+        books = filter_books(self.get_queryset(), request.query_params)  # ?ordering= is ignored, books are streamed by id
+        return StreamingHttpResponse(iter_books_ndjson(books, settings.EXPORT_CHUNK_SIZE), content_type="application/x-ndjson")
 
     @action(
         methods=["post", "get"],
@@ -69,24 +157,52 @@ class BookViewSet(ModelViewSet, GenericViewSet):
         url_path="comments",
         permission_classes=[IsAuthenticated, IsAuthorOrReadOnly],
         serializer_class=serializers.CommentSerializer,
+        pagination_class=CommentCursorPagination,
+        filter_backends=[],
     )
     def comment(self, request: Request, pk: int):
         """
         Allows us create or view a comment(s) by URL like /api/books/<pk>/comments/
         """
         if request.method == "POST":
-            request.data.update({"book": pk})
+            book = get_object_or_404(models.Book, pk=pk)
             comment_serializer = self.get_serializer(data=request.data)
             comment_serializer.is_valid(raise_exception=True)
-            comment_serializer.save()
+            with transaction.atomic():
+                comment = comment_serializer.save(book=book)
+                models.Book.objects.filter(pk=book.pk).add_comments(1, comment.creation_date)
             return Response(comment_serializer.data, status.HTTP_201_CREATED)
 
         if request.method == "GET":
             book = self.get_object()
-            book_serializer = serializers.BookSerializer(book)
-            comment_serializer = self.get_serializer(book.comments, many=True)
-            response = {**book_serializer.data, "comments": comment_serializer.data}
-            return Response(response, status=status.HTTP_200_OK)
+            return self.book_conditional_response(request, book, lambda: self.get_comments_response(request, book))
+
+    def get_comments_response(self, request: Request, book: models.Book):
+        book_serializer = serializers.BookListSerializer(book)
+        if settings.COMPILED_SERIALIZERS:
+            comments = compile_serializer(serializers.CommentSerializer).paginate(self.paginator, book.comments.all(), request, self)
+        else:
+            comments = self.get_serializer(self.paginate_queryset(book.comments.all()), many=True).data
+        response = self.paginator.get_nested_data(book_serializer.data, "comments", comments)
+        return Response(response, status=status.HTTP_200_OK)
+
+    @action(
+        methods=["post"],
+        detail=True,
+        url_path="comments/bulk",
+        serializer_class=serializers.CommentSerializer,
+    )
+    def bulk_comment(self, request: Request, pk: int):
+        """
+        Creates a list of comments by URL like /api/books/<pk>/comments/bulk/. Nothing is created if any of them is invalid
+        """
+        book = get_object_or_404(models.Book, pk=pk)
+        comment_serializer = self.get_bulk_serializer(request.data)
+        comment_serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            comments = comment_serializer.save(book=book, author=request.user)
+            models.Book.objects.filter(pk=book.pk).add_comments(len(comments), max(comment.creation_date for comment in comments))
+        return Response(comment_serializer.data, status.HTTP_201_CREATED)
 
     @action(
         methods=["put", "patch", "delete", "get"],
@@ -97,52 +213,119 @@ class BookViewSet(ModelViewSet, GenericViewSet):
     )
     def edit_or_remove_comment(self, request: Request, pk: int, comment_id: int):
         """
-        Allows to edit or delete a comment by URL like /api/books/<pk>/comments/<comment_id>
+        Allows to edit or delete a comment by URL like /api/books/<pk>/comments/<comment_id>.
+        Edits and deletes are a single statement conditional on the author, nothing is read before them
         """
+        if not str(pk).isdigit():
+            raise Http404
+        pk, comment_id = int(pk), int(comment_id)
         if request.method == "DELETE":
-            comment = get_object_or_404(models.Comment, id=comment_id)
-            self.check_object_permissions(
-                request, comment
-            )  # As I used self.get_object in previous action I can't overload it. But I can check permission using this method anyways
-            comment.delete()
+            with transaction.atomic():
+                if not models.Comment.objects.filter(id=comment_id, book_id=pk, author_id=request.user.id).delete_rows():
+                    self.comment_not_changed(request, pk, comment_id)
+                search.remove(models.Comment(id=comment_id))  # comments have no delete receivers, see book_review_app.signals
+                book = models.Book.objects.filter(pk=pk).remove_comments(1, returning=["genre_id"])[0]
+                bump_generation_on_commit(f"genre:{book['genre_id']}")
             return Response("Comment deleted", status.HTTP_204_NO_CONTENT)
 
         if request.method in ["PUT", "PATCH"]:
-            comment = get_object_or_404(models.Comment, id=comment_id)
-            self.check_object_permissions(request, comment)
-            comment_serializer = self.get_serializer(comment, request.data, partial=True)
-            comment_serializer.is_valid()
-            comment_serializer.save()
-            return Response(comment_serializer.data, status.HTTP_200_OK)
+            comment_serializer = self.get_serializer(data=request.data, partial=True)
+            comment_serializer.is_valid(raise_exception=True)
+            changes = comment_serializer.validated_data
+            with transaction.atomic():
+                comments = models.Comment.objects.filter(id=comment_id, book_id=pk, author_id=request.user.id).update_returning(
+                    COMMENT_COLUMNS, **changes, modified_at=timezone.now()
+                )
+                if not comments:
+                    self.comment_not_changed(request, pk, comment_id)
+                comment = models.Comment(**comments[0])
+                books = models.Book.objects.filter(pk=pk)
+                if "creation_date" in changes:
+                    # last_commented_at is on the genre page too
+                    book = books.refresh_last_commented(returning=["genre_id"])[0]
+                    bump_generation_on_commit(f"genre:{book['genre_id']}")
+                else:
+                    books.touch()
+                if "text" in changes:
+                    search.index([comment])  # update() sends no post_save
+            return Response(self.get_serializer(comment).data, status.HTTP_200_OK)
 
         if request.method == "GET":
-            comment = get_object_or_404(models.Comment, id=comment_id)
-            comment_serializer = self.get_serializer(comment)
-            return Response(comment_serializer.data, status=status.HTTP_200_OK)
+            comment = get_object_or_404(models.Comment, id=comment_id, book_id=pk)
+            return conditional_response(
+                request, f"comment:{comment.pk}:{comment.modified_at.isoformat()}", comment.modified_at, lambda: Response(self.get_serializer(comment).data)
+            )
 
+    def comment_not_changed(self, request: Request, pk: int, comment_id: int):
+        """
+        Nothing matched a conditional edit or delete: 403 if the comment exists, 404 otherwise
+        """
+        if models.Comment.objects.filter(id=comment_id, book_id=pk).exists():
+            self.permission_denied(request)
+        raise Http404
 
-class GenreViewSet(ModelViewSet, GenericViewSet):
+
+class GenreViewSet(TimingMixin, WriteRetryMixin, CompiledListMixin, SparseFieldsetMixin, ModelViewSet, GenericViewSet):
+    replica_reads = True
     queryset = models.Genre.objects.all()
     serializer_class = serializers.GenreSerializer
+    sparse_fieldset_actions = ("list",)  # ?fields= of retrieve applies to books_by_genre
     permission_classes = [
         IsAuthenticated,
         IsAdminOrReadOnly,
     ]  # Assuming that only admin can add new genre (because, hmmm, that's how I see it)
 
+    def list(self, request, *args, **kwargs):
+        return cached_response(request, ["genres"], lambda: super(GenreViewSet, self).list(request, *args, **kwargs))
+
     def retrieve(self, request, *args, **kwargs):
+        """
+        Cached until the genre or one of its books changes (see book_review_app.signals)
+        """
+        if not kwargs["pk"].isdigit():
+            return self.get_retrieve_response(request)
+        return cached_response(request, [f"genre:{int(kwargs['pk'])}"], lambda: self.get_retrieve_response(request))
+
+    def get_retrieve_response(self, request):
         genre = self.get_object()
-        books_by_genre = genre.books.all()
+        paginator = BookCursorPagination()
+        books = genre.books.all()
+        fields = parse_fields(request, serializers.BookListSerializer)  # ?fields= applies to the books
+        if settings.COMPILED_SERIALIZERS:
+            books_by_genre = compile_serializer(serializers.BookListSerializer, fields).paginate(paginator, books, request, self)
+        else:
+            if fields is not None:
+                books = only_fields(books, fields, paginator.ordering)
+            books_by_genre = serializers.BookListSerializer(paginator.paginate_queryset(books, request, view=self), many=True, fields=fields).data
         serializer = self.get_serializer(genre)
-        b_serializer = serializers.BookSerializer(books_by_genre, many=True)
 
-        response = {
-            **serializer.data,
-            "books_by_genre": b_serializer.data,
-        }
+        response = paginator.get_nested_data(serializer.data, "books_by_genre", books_by_genre)
         return Response(response)
 
 
-class LibraryViewSet(ModelViewSet, GenericViewSet):
+class LibraryViewSet(TimingMixin, WriteRetryMixin, CompiledListMixin, SparseFieldsetMixin, SerializerPerActionMixin, ModelViewSet, GenericViewSet):
+    replica_reads = True
     queryset = models.Library.objects.all()
     serializer_class = serializers.LibrarySerializer
+    serializer_classes = {"list": serializers.LibraryListSerializer}
     permission_classes = [IsAuthenticated, IsAuthorOrReadOnly]
+    filter_backends = [IsAuthorFilterBackend]
+
+
+class SearchViewSet(TimingMixin, GenericViewSet):
+    pagination_class = SearchPagination
+
+    def list(self, request: Request):
+        """
+        Ranked full-text search over book titles and comments by URL like /api/search/?q=<words>&type=<book|comment>
+        """
+        terms = search.tokenize(request.query_params.get("q", ""))
+        if not terms:
+            raise ValidationError({"q": ["This field is required."]})
+
+        kind = request.query_params.get("type")
+        if kind is not None and kind not in search.KINDS:
+            raise ValidationError({"type": [f"Must be one of: {', '.join(search.KINDS)}."]})
+
+        hits = self.paginate_queryset(search.search(request.query_params["q"], [kind] if kind else None))
+        return self.get_paginated_response(hits)